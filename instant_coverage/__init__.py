@@ -1,16 +1,40 @@
+import copy
+import os
+import random
+import re
+import select
+import struct
 import sys
 import traceback
+import warnings
+from collections import OrderedDict
+from timeit import default_timer
 
 import django
 from django.conf import settings
+from django.http import HttpResponse
 from django.test.client import Client
+from django.test.utils import override_settings
 
-from mock import patch
 import six
+from six.moves import cPickle as pickle
+from six.moves.urllib.parse import urljoin, urlsplit, urlunsplit
+
+from .cache import ResponseCache
+from .errors import ErrorCollector, cluster_errors, detach_exception, reraise_detached
+from .findings import Finding, fingerprint, get_baseline, get_sink
+from .links import extract_urls, response_text
+from .profiling import TemplateProfiling, profiler
 
 if sys.version_info >= (3, 6):
-    from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type  # noqa: F401
-    from .type_utils import ERROR_TYPE, InstantCacheDict, TestHttpResponse, ExpectTestCase  # noqa: F401
+    from typing import TYPE_CHECKING
+    from typing import Any, Callable, Dict, IO, Iterable, List, Optional, Sequence, Set, Tuple, Type  # noqa: F401
+    from .errors import CapturedError  # noqa: F401
+    from .profiling import _Frame  # noqa: F401
+    from .type_utils import InstantCacheDict, TestHttpResponse, ExpectTestCase  # noqa: F401
+    if TYPE_CHECKING:
+        import requests  # noqa: F401
+        from .load import LoadTestReport  # noqa: F401
 else:
     ExpectTestCase = object
 
@@ -25,6 +49,10 @@ else:
     )
     RESOLVE_PATH = 'django.core.urlresolvers.RegexURLPattern.resolve'
 
+#: whether ResolverMatches list what was tried to find them, the last of which
+#: is the pattern that matched
+RESOLVER_MATCH_TRIED = django.VERSION >= (3, 1)
+
 if django.VERSION >= (2, 0):
     from django.urls import clear_url_caches
 elif django.VERSION >= (1, 7):
@@ -47,7 +75,10 @@ IGNORE_TUTORIAL = (
     "undesired URL (such as ('^admin/',)) to {name}.uncovered_includes."
 )
 
-_instant_cache = {}  # type: Dict[Type[InstantCoverageAPI], InstantCacheDict]
+#: how many other URLs to mention for errors that happened on lots of them
+ERROR_CLUSTER_SAMPLES = 3
+
+_instant_cache = ResponseCache()
 
 
 def get_urlpatterns():  # type: () -> List[Any]
@@ -89,6 +120,209 @@ def extract_all_patterns_from_urlpatterns(
     return all_patterns
 
 
+def get_url_pattern_key(url):  # type: (str) -> str
+    """
+    Return a string identifying the URL pattern that url resolves to, or url
+    itself if it doesn't resolve to anything.
+    """
+
+    try:
+        match = resolve(url.split('?')[0])
+    except Exception:
+        return url
+
+    route = getattr(match, 'route', None)  # django >= 2.2
+    if route is not None:
+        return route
+
+    return '{0}.{1} {2}'.format(
+        getattr(match.func, '__module__', ''),
+        getattr(match.func, '__name__', repr(match.func)),
+        match.url_name,
+    )
+
+
+def get_matched_pattern(match):  # type: (Any) -> Optional[URLPattern]
+    """
+    Return the URLPattern that a ResolverMatch came from, if it knows; on
+    django 3.1 and newer, the last thing it tried is what it matched.
+    """
+
+    tried = getattr(match, 'tried', None)
+    if tried and tried[-1] and isinstance(tried[-1][-1], URLPattern):
+        return tried[-1][-1]
+
+    return None
+
+
+def group_urls_by_pattern(urls):  # type: (Iterable[str]) -> OrderedDict[str, List[str]]
+    """
+    Group urls by the URL pattern they resolve to, keeping them in the order
+    they were given.
+    """
+
+    groups = OrderedDict()  # type: OrderedDict[str, List[str]]
+    for url in urls:
+        groups.setdefault(get_url_pattern_key(url), []).append(url)
+    return groups
+
+
+def instant_check(name, content_types=None):  # type: (str, Optional[Iterable[str]]) -> Callable[[Any], Any]
+    """
+    Mark a method of an InstantCoverageAPI subclass as the check called name.
+    It will be called with (url, response) for each response whose
+    Content-Type (without its parameters) is one of content_types, or for
+    every response if content_types is None, and whatever it returns will be
+    available from instant_check_results(name), keyed by URL.
+
+    Every check a test class has is run in the same pass over its responses,
+    the first time any of their results are asked for.
+    """
+
+    def decorator(method):  # type: (Any) -> Any
+        method.instant_check = (
+            name, None if content_types is None else frozenset(content_types))
+        return method
+
+    return decorator
+
+
+def get_content_type(response):  # type: (TestHttpResponse) -> str
+    return response.get('Content-Type', '').split(';')[0].strip().lower()
+
+
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+
+
+class RedirectCycleError(Exception):
+    pass
+
+
+def _normalise_redirect_target(current, location):  # type: (str, str) -> Optional[str]
+    """
+    Return the path (and query) that a redirect from current to location
+    points at, or None if it points away from the test server.
+    """
+
+    scheme, netloc, path, query, fragment = urlsplit(urljoin(current, location))
+    if netloc and netloc != 'testserver':
+        return None
+    return urlunsplit(('', '', path, query, ''))
+
+
+#: tags whose links we follow when crawling
+CRAWLED_LINK_TAGS = frozenset(['a', 'area'])
+
+
+def _internal_link_target(page_url, link):  # type: (str, str) -> Optional[str]
+    """
+    Return the path (and query) of the page on the test server that link, on
+    the page at page_url, points at, or None if it doesn't point at one.
+    """
+
+    if urlsplit(link).scheme not in ('', 'http', 'https'):
+        return None
+
+    target = _normalise_redirect_target(page_url, link)
+    if not target:
+        return None
+
+    for prefix in (settings.STATIC_URL, settings.MEDIA_URL):
+        # django 3.1+ makes an empty MEDIA_URL '/'
+        if prefix and prefix != '/' and target.startswith(prefix):
+            return None
+
+    return target
+
+
+def _detach_database_connections():  # type: () -> None
+    """
+    Make a forked child open its own database connections rather than
+    sharing the sockets it inherited from its parent. In-memory SQLite
+    databases are left alone, since the child has its own copy of those.
+    """
+
+    from django.db import connections
+
+    for connection in connections.all():
+        name = six.text_type(connection.settings_dict.get('NAME') or '')
+        if connection.vendor == 'sqlite' and (
+            name in ('', ':memory:') or 'mode=memory' in name
+        ):
+            continue
+        connection.connection = None
+
+
+def _flatten_response(response):  # type: (TestHttpResponse) -> Tuple[Any, ...]
+    if getattr(response, 'streaming', False):
+        content = b''.join(response.streaming_content)  # type: ignore
+    else:
+        content = response.content
+
+    return (
+        response.status_code, list(response.items()), content,
+        list(getattr(response, 'redirect_chain', [])),
+        getattr(response, 'instant_queries', None),
+    )
+
+
+#: what comes before each message a forked worker sends: its length
+_MESSAGE_HEADER = struct.Struct('>I')
+
+
+def _send_to_parent(write_fd, message):  # type: (int, Tuple[Any, ...]) -> None
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    data = _MESSAGE_HEADER.pack(len(data)) + data
+    while data:
+        data = data[os.write(write_fd, data):]
+
+
+def _get_pattern_indices(pattern, patterns=None):  # type: (Any, Optional[List[Any]]) -> Optional[Tuple[int, ...]]
+    """
+    Return where pattern is in the URLconf, as the index of it (or the
+    include it's in) at each level, so that a forked worker can tell its
+    parent which pattern it means without pickling it.
+    """
+
+    if pattern is None:
+        return None
+
+    for i, candidate in enumerate(get_urlpatterns() if patterns is None else patterns):
+        if candidate is pattern:
+            return (i,)
+        if isinstance(candidate, URLResolver):
+            found = _get_pattern_indices(pattern, candidate.url_patterns)
+            if found is not None:
+                return (i,) + found
+
+    return None
+
+
+def _get_pattern_at(indices):  # type: (Optional[Sequence[int]]) -> Any
+    if indices is None:
+        return None
+
+    pattern = None  # type: Any
+    patterns = get_urlpatterns()
+    for i in indices:
+        pattern = patterns[i]
+        patterns = getattr(pattern, 'url_patterns', [])
+
+    return pattern
+
+
+def _rebuild_response(
+    status_code, headers, content, redirect_chain, queries=None,
+):  # type: (int, List[Tuple[str, str]], bytes, List[Tuple[str, int]], Optional[Dict[str, int]]) -> TestHttpResponse
+    response = HttpResponse(content, status=status_code)
+    for header, value in headers:
+        response[header] = value
+    response.redirect_chain = redirect_chain  # type: ignore
+    if queries is not None:
+        response.instant_queries = queries  # type: ignore
+    return response  # type: ignore
+
+
 class InstantCoverageAPI(ExpectTestCase):
     """
     The API provided by InstantCoverageMixin with none of the tests.
@@ -106,9 +340,118 @@ class InstantCoverageAPI(ExpectTestCase):
     #: whether to show full tracebacks in test_no_errors
     instant_tracebacks = False
 
+    #: how many tracebacks to keep for each kind of error when
+    #: instant_tracebacks is set
+    instant_tracebacks_per_group = 3
+
     #: whether the test client should follow redirects when loading covered URLs
     follow_redirects = True
 
+    #: whether redirects to a page we've already loaded should reuse it
+    instant_share_redirects = False
+
+    #: if set, fork this many worker processes to load covered URLs with
+    instant_fork_workers = None  # type: Optional[int]
+
+    #: if set, stop loading covered URLs once this many have raised exceptions
+    instant_max_errors = None  # type: Optional[int]
+
+    #: if set, stop loading covered URLs once this many seconds have passed
+    instant_time_budget = None  # type: Optional[float]
+
+    #: how many links deep to follow links to other pages from the pages in
+    #: covered_urls, loading the ones we haven't seen yet
+    instant_crawl_depth = 0
+
+    #: the most pages to load for each URL pattern when following links
+    instant_crawl_per_pattern = 10  # type: Optional[int]
+
+    #: regexes matching paths that shouldn't be loaded when following links,
+    #: on top of uncovered_urls
+    instant_crawl_ignore = []  # type: Sequence[str]
+
+    #: whether to load one URL for each URL pattern before loading the rest
+    instant_canary_first = False
+
+    #: if set, only load this many of the covered URLs for each URL pattern
+    instant_sample_size = None  # type: Optional[int]
+
+    #: seed for picking which URLs to load when instant_sample_size is set
+    instant_sample_seed = 0  # type: Any
+
+    #: if set, write findings to this file as JSON lines, as each test
+    #: finishes going through the responses
+    instant_findings_path = None  # type: Optional[str]
+
+    #: the most problems to list in a single failure message
+    instant_report_limit = 100  # type: Optional[int]
+
+    #: if set, only fail on findings that aren't recorded in this file
+    instant_baseline_path = None  # type: Optional[str]
+
+    #: whether to record findings to instant_baseline_path instead of failing
+    instant_update_baseline = False
+
+    #: names of personas to load covered URLs as, each with a test client of
+    #: its own that set_up_persona gets ready once before loading anything
+    instant_personas = []  # type: Sequence[str]
+
+    #: if set, the session engine to use while setting up and loading pages as
+    #: personas, like 'django.contrib.sessions.backends.cache'
+    instant_persona_session_engine = None  # type: Optional[str]
+
+    #: the persona whose client is being used to load covered URLs, if any
+    instant_persona = None  # type: Optional[str]
+
+    #: whether to load covered URLs over HTTP from this test's
+    #: live_server_url (on a LiveServerTestCase) rather than with the test
+    #: client
+    instant_live_server = False
+
+    #: if set, load covered URLs over HTTP from the server at this root URL
+    #: rather than with the test client
+    instant_live_server_url = None  # type: Optional[str]
+
+    #: how many covered URLs to load from the live server at once
+    instant_live_workers = 4
+
+    #: how many seconds instant_load_test runs for by default
+    instant_load_duration = 10.0  # type: Optional[float]
+
+    #: if set, how many requests instant_load_test makes by default, stopping
+    #: at this or instant_load_duration, whichever comes first
+    instant_load_requests = None  # type: Optional[int]
+
+    #: how many requests instant_load_test makes at once by default. With the
+    #: test client, every thread but the test's own has a database connection
+    #: of its own, which can't see anything a TestCase has made in its
+    #: transaction, so keep this at 1 for those
+    instant_load_concurrency = 1
+
+    #: set to True to trace how much memory loading URLs, each check and each
+    #: test needs, and print a table of where the time and memory went when
+    #: the run finishes
+    instant_profile = False
+
+    #: if set, write how long loading URLs, each check and each test took
+    #: (and how much memory they needed) to this path as JSON when the run
+    #: finishes; each worker of a parallel run writes a file of its own (see
+    #: instant_findings_path)
+    instant_profile_path = None  # type: Optional[str]
+
+    #: set to True to time every template rendered while loading URLs, and
+    #: include them in the table printed when the run finishes
+    instant_profile_templates = False
+
+    #: if set, roughly how many bytes of responses to keep between tests,
+    #: across all test classes; whatever was used least recently is dropped
+    #: (and loaded again if it's needed again) to make room
+    instant_cache_max_bytes = None  # type: Optional[int]
+
+    #: set to False to keep this class's responses once all its tests have
+    #: run, rather than dropping them in tearDownClass
+    instant_release_cache = True
+
     def attempt_to_get_internal_url(self, url):  # type: (str) -> TestHttpResponse
         return self.client.get(url, **self.get_client_kwargs())
 
@@ -117,61 +460,927 @@ class InstantCoverageAPI(ExpectTestCase):
             'follow': self.follow_redirects,
         }
 
-    def _get_responses(self):  # type: () -> None
-        responses = {}  # type: Dict[str, TestHttpResponse]
-        errors = {}  # type: Dict[str, ERROR_TYPE]
+    def get_live_session(self):  # type: () -> requests.Session
+        """
+        Return a requests session for a thread to load pages from the live
+        server with, carrying the test client's cookies (and so any session
+        set_up_persona has logged it in to).
+        """
+
+        import requests  # noqa: F811
+
+        session = requests.Session()
+        for morsel in self.client.cookies.values():
+            session.cookies.set(morsel.key, morsel.value)
+        return session
+
+    def attempt_to_get_live_url(self, session, url):  # type: (requests.Session, str) -> requests.Response
+        return session.get(url, allow_redirects=self.follow_redirects)
+
+    def get_load_test_fetcher(self, concurrency):  # type: (int) -> Callable[[str], int]
+        """
+        Return a function that loads a URL for a load test and returns its
+        status code. This is called once in each of the load test's worker
+        threads. When there is more than one, each gets a test client of its
+        own (with the cookies of self.client) rather than using
+        attempt_to_get_internal_url.
+        """
+
+        base_url = self._get_live_server_url()
+
+        if base_url is not None:
+            session = self.get_live_session()
+            return lambda url: self.attempt_to_get_live_url(session, urljoin(base_url, url)).status_code
+
+        if concurrency == 1:
+            return lambda url: self.attempt_to_get_internal_url(url).status_code
+
+        client = self.make_client()
+        client.cookies = copy.deepcopy(self.client.cookies)
+        kwargs = self.get_client_kwargs()
+        return lambda url: client.get(url, **kwargs).status_code
+
+    def make_client(self):  # type: () -> Client
+        """
+        Return a new test client of the kind self.client is, for personas and
+        load test threads to load pages with.
+        """
+
+        # django 1.4 has no client_class
+        return getattr(self, 'client_class', Client)()
+
+    def set_up_persona(self, client, persona):  # type: (Client, str) -> None
+        """
+        Get client ready to load pages as persona, by logging it in, for
+        instance. The 'anonymous' persona needs no setting up.
+        """
+
+        if persona != 'anonymous':
+            raise NotImplementedError(
+                'Override {0}.set_up_persona to set up the {1!r} persona.'
+                .format(self.__class__.__name__, persona))
+
+    def warm_up_instant_crawl(self):  # type: () -> None
+        """
+        Get everything loaded that forked workers would otherwise each have to
+        load for themselves.
+        """
+
+        get_urlpatterns()
 
         for url in self.covered_urls:
             try:
-                response = self.attempt_to_get_internal_url(url)
+                resolve(url.split('?')[0])
             except Exception:
-                errors[url] = sys.exc_info()
+                pass
+
+        try:
+            from django.template import engines
+        except ImportError:
+            pass  # django < 1.8
+        else:
+            for engine in engines.all():
+                # template loaders get set up the first time they're asked for
+                getattr(getattr(engine, 'engine', None), 'template_loaders', None)
+
+    def _crawl_should_stop(self, error_count, deadline):  # type: (int, Optional[float]) -> bool
+        return (
+            (self.instant_max_errors is not None and error_count >= self.instant_max_errors) or
+            (deadline is not None and default_timer() >= deadline)
+        )
+
+    def _record_redirects(self, url, response, cache):  # type: (str, TestHttpResponse, InstantCacheDict) -> None
+        current = url
+        for location, status_code in getattr(response, 'redirect_chain', []):
+            target = _normalise_redirect_target(current, location)
+            if target is None:
+                break
+            cache['redirects'][current] = target
+            current = target
+
+    def _get_following_shared_redirects(
+        self, url, cache,
+    ):  # type: (str, InstantCacheDict) -> TestHttpResponse
+        """
+        Load url, following redirects ourselves so that, if one leads
+        somewhere we've already been led to or loaded directly, we can reuse
+        the response we got from there last time rather than drawing it again.
+        """
+
+        chain = []  # type: List[Tuple[str, int]]
+        current = url
+        visited = [url]
+        shared = cache['redirect_targets']
+
+        # make attempt_to_get_internal_url (and anything it's been overridden
+        # with) hand us the redirects rather than following them
+        follow_redirects, self.follow_redirects = self.follow_redirects, False
+        try:
+            while True:
+                if chain and current in shared:
+                    response = copy.copy(shared[current])
+                    break
+
+                loaded = cache['responses'].get(current) if chain else None
+                if loaded is not None and not getattr(loaded, 'redirect_chain', None):
+                    shared[current] = loaded
+                    response = copy.copy(loaded)
+                    break
+
+                response = self.attempt_to_get_internal_url(current)
+
+                location = response.get('Location')
+                if response.status_code not in REDIRECT_STATUS_CODES or not location:
+                    if chain:
+                        shared[current] = response
+                    break
+
+                target = _normalise_redirect_target(current, location)
+                chain.append((location, response.status_code))
+                if target is None:
+                    break
+
+                cache['redirects'][current] = target
+
+                if target in visited or len(chain) > 20:
+                    raise RedirectCycleError('Redirect loop detected.')
+
+                visited.append(target)
+                current = target
+        finally:
+            self.follow_redirects = follow_redirects
+
+        response.redirect_chain = chain
+        return response
+
+    def _fetch_url(self, url, cache):  # type: (str, InstantCacheDict) -> None
+        started = default_timer()
+
+        try:
+            if self.instant_share_redirects and self.follow_redirects:
+                response = self._get_following_shared_redirects(url, cache)
+            else:
+                response = self.attempt_to_get_internal_url(url)
+                self._record_redirects(url, response, cache)
+        except Exception:
+            cache['errors'][url] = cache['error_collector'].capture(sys.exc_info())
+        else:
+            cache['responses'][url] = response
+
+            # note which pattern the request for url was resolved against, so
+            # that coverage accounting needn't resolve it again
+            if not getattr(response, 'redirect_chain', None):
+                pattern = get_matched_pattern(getattr(
+                    getattr(response, 'wsgi_request', None), 'resolver_match', None))
+                if pattern is not None:
+                    cache['patterns'][url] = pattern
+
+        cache['timings'][url] = default_timer() - started
+
+    def _fetch_urls(
+        self, urls, cache, deadline,
+    ):  # type: (Sequence[str], InstantCacheDict, Optional[float]) -> None
+        """
+        Load urls into cache, noting any we don't get around to because we
+        ran out of time or saw too many errors.
+        """
+
+        for i, url in enumerate(urls):
+            if self._crawl_should_stop(len(cache['errors']), deadline):
+                cache['skipped'].extend(urls[i:])
+                return
+
+            self._fetch_url(url, cache)
+
+    def _fetch_urls_in_child(
+        self, urls, cache, write_fd, deadline,
+    ):  # type: (Sequence[str], InstantCacheDict, int, Optional[float]) -> None
+        """
+        Load urls with _fetch_url into a cache of the child's own, starting
+        from what the parent had already loaded, and send what we find out
+        about each one back through write_fd as we go.
+        """
+
+        _detach_database_connections()
+        child = {
+            'responses': dict(cache['responses']), 'errors': {}, 'skipped': [], 'timings': {},
+            'error_collector': self._make_error_collector(),
+            'redirects': dict(cache['redirects']),
+            'redirect_targets': dict(cache['redirect_targets']),
+            'checks': None, 'check_errors': {}, 'discovered': OrderedDict(),
+            'patterns': {},
+        }  # type: InstantCacheDict
+
+        for url in urls:
+            if self._crawl_should_stop(len(child['errors']), deadline):
+                _send_to_parent(write_fd, (url, 'skipped', None, None, {}, {}, None))
+                continue
+
+            redirects, targets = set(child['redirects']), set(child['redirect_targets'])
+            self._fetch_url(url, child)
+
+            if url in child['errors']:
+                kind, result = 'error', child['errors'][url]  # type: Tuple[str, Any]
+            else:
+                kind, result = 'response', _flatten_response(child['responses'][url])
+
+            _send_to_parent(write_fd, (
+                url, kind, result, child['timings'][url],
+                dict(
+                    (source, target) for source, target in six.iteritems(child['redirects'])
+                    if source not in redirects
+                ),
+                dict(
+                    (target, _flatten_response(response))
+                    for target, response in six.iteritems(child['redirect_targets'])
+                    if target not in targets
+                ),
+                _get_pattern_indices(child['patterns'].get(url)),
+            ))
+
+    def _adopt_child_result(self, message, cache):  # type: (Tuple[Any, ...], InstantCacheDict) -> str
+        url, kind, result, timing, redirects, targets, pattern_indices = message
+
+        if kind == 'response':
+            cache['responses'][url] = _rebuild_response(*result)
+        elif kind == 'error':
+            cache['errors'][url] = cache['error_collector'].adopt(result)
+        else:
+            cache['skipped'].append(url)
+
+        if timing is not None:
+            cache['timings'][url] = timing
+
+        cache['redirects'].update(redirects)
+        for target, flattened in six.iteritems(targets):
+            if target not in cache['redirect_targets']:
+                cache['redirect_targets'][target] = _rebuild_response(*flattened)
+
+        pattern = _get_pattern_at(pattern_indices)
+        if pattern is not None:
+            cache['patterns'][url] = pattern
+
+        return url
+
+    def _fetch_urls_forked(
+        self, urls, cache, deadline,
+    ):  # type: (Sequence[str], InstantCacheDict, Optional[float]) -> None
+        """
+        Load urls in worker processes forked from this one, so that they
+        inherit everything we've already loaded rather than each having to
+        set up django for themselves.
+
+        Each worker counts errors towards instant_max_errors separately.
+        """
+
+        if not urls:
+            return
+
+        # load one page here so that the middleware and anything else that
+        # gets set up on the first request is ready before we fork
+        self._fetch_urls(urls[:1], cache, deadline)
+        urls = urls[1:]
+
+        if cache['skipped'] or not urls:
+            cache['skipped'].extend(urls)
+            return
+
+        workers = min(self.instant_fork_workers or 1, len(urls))
+        pipes = []
+
+        for i in range(workers):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+
+            if pid == 0:
+                status = 0
+                try:
+                    os.close(read_fd)
+                    self._fetch_urls_in_child(urls[i::workers], cache, write_fd, deadline)
+                except BaseException:
+                    traceback.print_exc()
+                    status = 1
+                finally:
+                    os._exit(status)
+
+            os.close(write_fd)
+            pipes.append((pid, read_fd))
+
+        reported = set()
+        buffers = dict((read_fd, bytearray()) for pid, read_fd in pipes)
+
+        # read from every worker as soon as it has something to say, so that
+        # none of them are left waiting on a full pipe while we read another
+        while buffers:
+            readable, _, _ = select.select(list(buffers), [], [])
+
+            for read_fd in readable:
+                chunk = os.read(read_fd, 1 << 16)
+                if not chunk:
+                    os.close(read_fd)
+                    del buffers[read_fd]
+                    continue
+
+                buffer = buffers[read_fd]
+                buffer += chunk
+
+                while len(buffer) >= _MESSAGE_HEADER.size:
+                    size, = _MESSAGE_HEADER.unpack(bytes(buffer[:_MESSAGE_HEADER.size]))
+                    end = _MESSAGE_HEADER.size + size
+                    if len(buffer) < end:
+                        break
+
+                    message = pickle.loads(bytes(buffer[_MESSAGE_HEADER.size:end]))
+                    del buffer[:end]
+                    reported.add(self._adopt_child_result(message, cache))
+
+        for pid, read_fd in pipes:
+            os.waitpid(pid, 0)
+
+        for url in urls:
+            if url not in reported:
+                cache['errors'][url] = cache['error_collector'].error(
+                    'RuntimeError',
+                    'the worker loading this url exited without reporting back',
+                )
+
+    def _sample_urls(self, groups):  # type: (OrderedDict[str, List[str]]) -> OrderedDict[str, List[str]]
+        sampled = OrderedDict()  # type: OrderedDict[str, List[str]]
+        size = self.instant_sample_size or 0
+
+        for key, group in six.iteritems(groups):
+            if len(group) <= size:
+                sampled[key] = group
+                continue
+
+            # seed per pattern, so adding urls for one pattern doesn't change
+            # which get picked for all the others
+            rng = random.Random('{0}:{1}'.format(self.instant_sample_seed, key))
+            picked = set(rng.sample(range(len(group)), size))
+            sampled[key] = [url for i, url in enumerate(group) if i in picked]
+
+        return sampled
+
+    def _get_urls_to_load(self):  # type: () -> List[str]
+        urls = list(self.covered_urls)
+
+        if self.instant_sample_size is None and not self.instant_canary_first:
+            return urls
+
+        groups = group_urls_by_pattern(urls)
+
+        if self.instant_sample_size is not None:
+            groups = self._sample_urls(groups)
+
+        if self.instant_canary_first:
+            return [group[0] for group in groups.values()] + [
+                url for group in groups.values() for url in group[1:]
+            ]
+
+        sampled = set(url for group in groups.values() for url in group)
+        return [url for url in urls if url in sampled]
+
+    def _get_live_server_url(self):  # type: () -> Optional[str]
+        if not (self.instant_live_server or self.instant_live_server_url):
+            return None
+
+        base_url = self.instant_live_server_url or getattr(self, 'live_server_url', None)
+        if base_url is None:
+            raise ValueError(
+                'Set {0}.instant_live_server_url, or make it a '
+                'LiveServerTestCase.'.format(self.__class__.__name__))
+
+        return base_url
+
+    def _load_urls(
+        self, urls, cache, deadline,
+    ):  # type: (Sequence[str], InstantCacheDict, Optional[float]) -> None
+        base_url = self._get_live_server_url()
+
+        if base_url is not None:
+            from .live import LiveCrawl
+
+            LiveCrawl(self, base_url, self.instant_live_workers, cache, deadline).run(urls)
+        elif self.instant_fork_workers and hasattr(os, 'fork'):
+            self.warm_up_instant_crawl()
+            self._fetch_urls_forked(urls, cache, deadline)
+        else:
+            self._fetch_urls(urls, cache, deadline)
+
+    def _crawl(self, cache, deadline):  # type: (InstantCacheDict, Optional[float]) -> None
+        """
+        Follow links from the pages in cache breadth first, instant_crawl_depth
+        deep, loading the pages they lead to if they're not pages we've already
+        got (or been redirected to).
+        """
+
+        visited = set(self.covered_urls) | set(self.uncovered_urls)
+        visited.update(cache['responses'])
+        visited.update(cache['errors'])
+        visited.update(cache['redirects'].values())
+        ignore = [re.compile(pattern) for pattern in self.instant_crawl_ignore]
+        per_pattern = {}  # type: Dict[str, int]
+        discovered = cache['discovered']
+        frontier = list(cache['responses'])
+
+        for depth in range(self.instant_crawl_depth):
+            found = []  # type: List[str]
+
+            for page_url in frontier:
+                response = cache['responses'].get(page_url)
+                if response is None or get_content_type(response) != 'text/html':
+                    continue
+
+                for tag, attribute, link in extract_urls(response_text(response)):
+                    if tag not in CRAWLED_LINK_TAGS:
+                        continue
+
+                    target = _internal_link_target(page_url, link)
+                    if target is None:
+                        continue
+
+                    if target in discovered:
+                        if page_url not in discovered[target]:
+                            discovered[target].append(page_url)
+                        continue
+
+                    if target in visited or any(p.search(target.split('?')[0]) for p in ignore):
+                        continue
+
+                    visited.add(target)
+                    key = get_url_pattern_key(target)
+                    if (
+                        self.instant_crawl_per_pattern is not None and
+                        per_pattern.get(key, 0) >= self.instant_crawl_per_pattern
+                    ):
+                        continue
+
+                    per_pattern[key] = per_pattern.get(key, 0) + 1
+                    discovered[target] = [page_url]
+                    found.append(target)
+
+            if not found or cache['skipped']:
+                cache['skipped'].extend(found)
+                return
+
+            self._load_urls(found, cache, deadline)
+            visited.update(cache['redirects'].values())
+            frontier = found
+
+    def _load_and_crawl(
+        self, urls, cache, deadline,
+    ):  # type: (Sequence[str], InstantCacheDict, Optional[float]) -> None
+        self._load_urls(urls, cache, deadline)
+        if self.instant_crawl_depth:
+            self._crawl(cache, deadline)
+
+    def _make_error_collector(self):  # type: () -> ErrorCollector
+        return ErrorCollector(
+            self.instant_tracebacks_per_group if self.instant_tracebacks else 0)
+
+    def _get_responses(self, persona=None):  # type: (Optional[str]) -> None
+        cache = {
+            'responses': {}, 'errors': {}, 'skipped': [], 'timings': {},
+            'error_collector': self._make_error_collector(),
+            'redirects': {}, 'redirect_targets': {},
+            'checks': None, 'check_errors': {}, 'discovered': OrderedDict(),
+            'patterns': {},
+        }  # type: InstantCacheDict
+        urls = self._get_urls_to_load()
+        deadline = (
+            None if self.instant_time_budget is None
+            else default_timer() + self.instant_time_budget
+        )
+
+        frame = self._start_profile('load', self._persona_url(persona, self.__class__.__name__))
+        templates = TemplateProfiling() if self.instant_profile_templates else None
+        if templates is not None:
+            templates.enable()
+
+        try:
+            if persona is not None:
+                self._fetch_urls_as_persona(persona, urls, cache, deadline)
             else:
-                responses[url] = response
+                self._load_and_crawl(urls, cache, deadline)
+        finally:
+            if templates is not None:
+                templates.disable()
+            frame.items = len(cache['responses']) + len(cache['errors'])
+            profiler.stop(frame)
+
+        # keep things in the order they were asked for (or found)
+        responses, errors = cache['responses'], cache['errors']
+        order = list(self.covered_urls) + list(cache['discovered'])
+        cache['responses'] = dict(
+            (url, responses[url]) for url in order if url in responses)
+        cache['errors'] = dict(
+            (url, errors[url]) for url in order if url in errors)
+
+        if cache['skipped'] and not cache['errors']:
+            warnings.warn(
+                '{0} ran out of time and did not load {1} of its covered URLs'
+                .format(self.__class__.__name__, len(cache['skipped'])))
 
         # We cache responses against the class because test runners tend to
         # use a new instance for each test, and we don't want to draw pages
         # more than once.
-        _instant_cache[self.__class__] = {
-            'responses': responses, 'errors': errors}
+        _instant_cache.set(self.__class__, persona, cache, self.instant_cache_max_bytes)
 
-    def _get_instant_cache(self):  # type: () -> InstantCacheDict
-        if self.__class__ not in _instant_cache:
-            self._get_responses()
+    def _fetch_urls_as_persona(
+        self, persona, urls, cache, deadline,
+    ):  # type: (str, Sequence[str], InstantCacheDict, Optional[float]) -> None
+        """
+        Load urls with a client of persona's own, set up once and used for all
+        of them.
+        """
+
+        session_settings = (
+            None if self.instant_persona_session_engine is None
+            else override_settings(SESSION_ENGINE=self.instant_persona_session_engine)
+        )
+        if session_settings is not None:
+            session_settings.enable()
+
+        original_client = getattr(self, 'client', None)
+        try:
+            self.client = self.make_client()
+            self.set_up_persona(self.client, persona)
+            self.instant_persona = persona
+            self._load_and_crawl(urls, cache, deadline)
+        finally:
+            self.client = original_client  # type: ignore
+            self.instant_persona = None
+            if session_settings is not None:
+                session_settings.disable()
+
+    def _get_personas(self):  # type: () -> List[Optional[str]]
+        return list(self.instant_personas) or [None]
+
+    def _get_instant_cache(self, persona=None):  # type: (Optional[str]) -> InstantCacheDict
+        """
+        Return the cache for persona, or for the first of instant_personas if
+        persona isn't given.
+        """
+
+        if persona is None:
+            persona = self._get_personas()[0]
 
-        return _instant_cache[self.__class__]
+        cache = _instant_cache.get(self.__class__, persona)
+        if cache is None:
+            self._get_responses(persona)
+            cache = _instant_cache.get(self.__class__, persona)
+            assert cache is not None
+
+        return cache
+
+    def _persona_url(self, persona, url):  # type: (Optional[str], str) -> str
+        """
+        Return url, marked with persona if there's more than one.
+        """
+
+        if len(self.instant_personas) < 2:
+            return url
+
+        return '{0} (as {1})'.format(url, persona)
+
+    def _each_persona(self, key):  # type: (str) -> List[Tuple[str, Any]]
+        """
+        Return (url, value) for everything in cache[key] for every persona,
+        with urls marked with their persona if there's more than one.
+        """
+
+        return [
+            (self._persona_url(persona, url), value)
+            for persona in self._get_personas()
+            for url, value in six.iteritems(self._get_instant_cache(persona)[key])  # type: ignore
+        ]
 
     def setUp(self):  # type: () -> None
         super(InstantCoverageAPI, self).setUp()
         if not hasattr(self, 'client'):
             # django 1.4 does not do this automatically
-            self.client = Client()
+            self.client = self.make_client()
+
+        self.addCleanup(profiler.stop, self._start_profile(
+            'test', '{0}.{1}'.format(self.__class__.__name__, self._testMethodName)))
+
+    @classmethod
+    def tearDownClass(cls):  # type: () -> None
+        if cls.instant_release_cache:
+            _instant_cache.release(cls)
+        super(InstantCoverageAPI, cls).tearDownClass()
+
+    def _start_profile(self, kind, name, items=0):  # type: (str, str, int) -> _Frame
+        if self.instant_profile or self.instant_profile_templates:
+            profiler.summarise = True
+        if self.instant_profile_path is not None:
+            profiler.report_paths.add(self.instant_profile_path)
+        return profiler.start(kind, name, items, memory=self.instant_profile)
+
+    def instant_profiles(self):  # type: () -> List[Dict[str, Any]]
+        """
+        Return how long (in wall and CPU seconds) loading URLs, each check and
+        each test that has run in this process so far took, how many URLs or
+        responses each dealt with, and, if instant_profile is set, the most
+        memory each had allocated at once, in bytes.
+        """
+
+        return profiler.as_dicts()
 
     def instant_responses(self):  # type: () -> Dict[str, TestHttpResponse]
         """
         Return a dictionary of responses, as returned by the Django test
-        client, keyed by URL.
+        client, keyed by URL. If there are instant_personas, these are the
+        responses seen by the first of them.
         """
 
         return self._get_instant_cache()['responses']
 
-    def instant_errors(self):  # type: () -> Dict[str, ERROR_TYPE]
+    def instant_persona_responses(self):  # type: () -> OrderedDict[Optional[str], Dict[str, TestHttpResponse]]
+        """
+        Return what instant_responses would for each of instant_personas,
+        keyed by persona (or by None, if there aren't any).
+        """
+
+        return OrderedDict(
+            (persona, self._get_instant_cache(persona)['responses'])
+            for persona in self._get_personas()
+        )
+
+    def instant_errors(self):  # type: () -> Dict[str, CapturedError]
+        """
+        Return a dictionary of CapturedErrors, describing the exceptions raised
+        when loading URLs, keyed by URL.
+        """
+
         return self._get_instant_cache()['errors']
 
+    def instant_skipped_urls(self):  # type: () -> List[str]
+        """
+        Return a list of covered URLs that were not loaded because
+        instant_max_errors or instant_time_budget was reached.
+        """
 
-class InstantCoverageMixin(InstantCoverageAPI):
-    def test_all_urls_accounted_for(self):  # type: () -> None
+        return self._get_instant_cache()['skipped']
+
+    def instant_redirects(self):  # type: () -> Dict[str, str]
         """
-        Ensure all URLs that have not been explicitly excluded are present in
-        self.covered_urls.
+        Return a dictionary of every redirect seen while loading covered URLs,
+        mapping the URL that redirected to the URL it redirected to.
         """
 
-        clear_url_caches()
-        seen_patterns = set()
+        return self._get_instant_cache()['redirects']
 
-        patterns = get_urlpatterns()
+    def instant_discovered_urls(self):  # type: () -> OrderedDict[str, List[str]]
+        """
+        Return the URLs that weren't in covered_urls but were loaded because
+        instant_crawl_depth is set, each with the URLs of the pages that
+        linked to it.
+        """
+
+        return self._get_instant_cache()['discovered']
+
+    def instant_timings(self):  # type: () -> Dict[str, float]
+        """
+        Return a dictionary of how many seconds each URL took to load, keyed
+        by URL.
+        """
+
+        return self._get_instant_cache()['timings']
+
+    def _get_instant_checks(self):  # type: () -> OrderedDict[str, Tuple[str, Optional[frozenset]]]
+        """
+        Return (attribute, content_types) for each check this test has, keyed
+        by check name. Checks overridden in subclasses replace the originals.
+        """
+
+        checks = OrderedDict()  # type: OrderedDict[str, Tuple[str, Optional[frozenset]]]
+
+        for klass in reversed(self.__class__.__mro__):
+            for attribute, value in six.iteritems(vars(klass)):
+                check = getattr(value, 'instant_check', None)
+                if check is not None:
+                    name, content_types = check
+                    checks[name] = (attribute, content_types)
+
+        return checks
+
+    def _run_instant_checks(self, cache):  # type: (InstantCacheDict) -> None
+        """
+        Route each response in cache to every check interested in its content
+        type, in a single pass.
+        """
+
+        by_content_type = {}  # type: Dict[str, List[Tuple[str, Callable[[str, TestHttpResponse], Any]]]]
+        for_everything = []  # type: List[Tuple[str, Callable[[str, TestHttpResponse], Any]]]
+        results = OrderedDict()  # type: OrderedDict[str, Dict[str, Any]]
+
+        for name, (attribute, content_types) in six.iteritems(self._get_instant_checks()):
+            results[name] = {}
+            check = (name, getattr(self, attribute))
+            if content_types is None:
+                for_everything.append(check)
+            else:
+                for content_type in content_types:
+                    by_content_type.setdefault(content_type, []).append(check)
+
+        errors = cache['check_errors']
+        # timing every check on every response isn't free, so only do it if
+        # someone's going to look
+        profile = self.instant_profile or self.instant_profile_path is not None
+
+        for url, response in six.iteritems(cache['responses']):
+            for name, method in by_content_type.get(get_content_type(response), []) + for_everything:
+                if name in errors:
+                    continue
+
+                frame = self._start_profile('check', name, items=1) if profile else None
+                try:
+                    results[name][url] = method(url, response)
+                except Exception:
+                    # keep the exception to raise from whichever test asks
+                    # for this check's results, rather than breaking them all
+                    errors[name] = detach_exception(sys.exc_info())
+                finally:
+                    if frame is not None:
+                        profiler.stop(frame)
+
+        cache['checks'] = results
+
+    def instant_check_results(self, name):  # type: (str) -> Dict[str, Any]
+        """
+        Return what the check called name returned for each response it was
+        interested in, keyed by URL. If it raised an exception, raise it again.
+        """
+
+        cache = self._get_instant_cache()
+
+        if cache['checks'] is None:
+            self._run_instant_checks(cache)
+
+        if name in cache['check_errors']:
+            reraise_detached(*cache['check_errors'][name])
+
+        checks = cache['checks']
+        assert checks is not None
+        return checks[name]
+
+    def instant_load_test(
+        self, duration=None, max_requests=None, concurrency=None,
+    ):  # type: (Optional[float], Optional[int], Optional[int]) -> LoadTestReport
+        """
+        Request covered URLs over and over, concurrency at a time, for
+        duration seconds or until we've made max_requests requests, and return
+        a LoadTestReport of how quickly each URL pattern responded and how
+        often it failed (by raising an exception or responding with a 5xx
+        status code).
+
+        Anything not given comes from instant_load_duration,
+        instant_load_requests and instant_load_concurrency.
+        """
+
+        if duration is None and max_requests is None:
+            duration, max_requests = self.instant_load_duration, self.instant_load_requests
+        concurrency = concurrency or self.instant_load_concurrency
+
+        urls = self._get_urls_to_load()
+        patterns = dict(
+            (url, pattern)
+            for pattern, group in six.iteritems(group_urls_by_pattern(urls))
+            for url in group
+        )
+
+        from .load import LoadRunner
+
+        return LoadRunner(
+            urls, patterns, lambda: self.get_load_test_fetcher(concurrency),
+            concurrency=concurrency, duration=duration, max_requests=max_requests,
+        ).run()
+
+    def record_finding(
+        self, check, url, detail, severity='error', baseline_key=None,
+    ):  # type: (str, Optional[str], str, str, Optional[str]) -> Finding
+        """
+        Make a note of a problem found by check on url, writing it out to
+        instant_findings_path if that's set.
+
+        If detail contains things that shift around without the problem
+        changing, like line numbers, provide a baseline_key without them to
+        identify this finding in baselines.
+        """
+
+        finding = Finding(
+            url=url, check=check, severity=severity, detail=detail,
+            timing=self.instant_timings().get(url) if url is not None else None,
+            fingerprint=fingerprint(
+                check, url, detail if baseline_key is None else baseline_key),
+        )
+
+        if self.instant_findings_path is not None:
+            get_sink(self.instant_findings_path).write(finding)
+
+        return finding
+
+    def new_findings(self, check, findings):  # type: (str, Sequence[Finding]) -> List[Finding]
+        """
+        Return those of findings that aren't in the baseline at
+        instant_baseline_path, which is all of them if there is no baseline.
+
+        If instant_update_baseline is set, the baseline is updated to contain
+        findings instead, and nothing is returned.
+        """
+
+        if self.instant_baseline_path is None:
+            return list(findings)
+
+        baseline = get_baseline(self.instant_baseline_path)
+
+        if self.instant_update_baseline:
+            # forget about every URL we loaded, including ones we were led to
+            # by crawling, so that problems that have since been fixed go too
+            urls = set([None] + [
+                self._persona_url(persona, url)
+                for persona in self._get_personas() for url in self.covered_urls
+            ])  # type: Set[Optional[str]]
+            urls.update(url for key in ('responses', 'errors') for url, _ in self._each_persona(key))
+            baseline.replace(check, urls, findings)
+            baseline.save()
+            return []
+
+        return baseline.new_findings(check, findings)
+
+    def summarise_report(self, entries):  # type: (Sequence[str]) -> List[str]
+        """
+        Cut entries down to instant_report_limit, so that failure messages
+        stay readable no matter how broken things are.
+        """
+
+        limit = self.instant_report_limit
+        if limit is None or len(entries) <= limit:
+            return list(entries)
+
+        return list(entries[:limit]) + ['...and {0} more{1}'.format(
+            len(entries) - limit,
+            '' if self.instant_findings_path is None
+            else ' (see {0})'.format(get_sink(self.instant_findings_path).path),
+        )]
+
+    def _get_matched_patterns(self, urls, quiet=False):  # type: (Iterable[str], bool) -> Dict[str, URLPattern]
+        """
+        Return the URLPattern each of urls resolves to. Where we've already
+        loaded a URL, we use the pattern its request was resolved against.
+        Resolution errors are raised unless quiet is set, in which case URLs
+        that don't resolve are left out.
+        """
+
+        known = {}  # type: Dict[str, URLPattern]
+        for cache in _instant_cache.for_class(self.__class__):
+            known.update(cache['patterns'])
+
+        matched = {}  # type: Dict[str, URLPattern]
+        unknown = []  # type: List[str]
+
+        for url in urls:
+            if url in known:
+                matched[url] = known[url]
+                continue
+
+            if not RESOLVER_MATCH_TRIED:
+                # resolving it would tell us nothing we can use
+                unknown.append(url)
+                continue
+
+            try:
+                pattern = get_matched_pattern(resolve(url.split('?')[0]))
+            except Exception:
+                if not quiet:
+                    raise
+                continue
+
+            if pattern is None:
+                unknown.append(url)
+            else:
+                matched[url] = pattern
+
+        if unknown:
+            matched.update(self._get_matched_patterns_by_patching(unknown, quiet))
+
+        return matched
+
+    def _get_matched_patterns_by_patching(
+        self, urls, quiet,
+    ):  # type: (Iterable[str], bool) -> Dict[str, URLPattern]
+        """
+        Find out which URLPattern each of urls resolves to by watching
+        URLPattern.resolve, for versions of django whose ResolverMatches
+        don't say.
+        """
+
+        from mock import patch
 
         original_resolve = URLPattern.resolve
+        seen = []  # type: List[URLPattern]
+        matched = {}  # type: Dict[str, URLPattern]
 
         def resolve_and_make_note(
             self, path,
@@ -179,13 +1388,54 @@ class InstantCoverageMixin(InstantCoverageAPI):
             match = original_resolve(self, path)
 
             if match:
-                seen_patterns.add(self)
+                seen.append(self)
 
             return match
 
         with patch(RESOLVE_PATH, resolve_and_make_note):
-            for url in list(self.covered_urls) + list(self.uncovered_urls):
-                resolve(url.split('?')[0])
+            for url in urls:
+                del seen[:]
+                try:
+                    resolve(url.split('?')[0])
+                except Exception:
+                    if not quiet:
+                        raise
+                    continue
+
+                if seen:
+                    matched[url] = seen[-1]
+
+        return matched
+
+    def _describe_skipped_urls(self):  # type: () -> str
+        skipped = sum(
+            len(self._get_instant_cache(persona)['skipped'])
+            for persona in self._get_personas()
+        )
+        if not skipped:
+            return ''
+
+        return (
+            '\n\nGave up early; {0} covered URLs were not loaded.'
+            .format(skipped)
+        )
+
+
+class InstantCoverageMixin(InstantCoverageAPI):
+    def test_all_urls_accounted_for(self):  # type: () -> None
+        """
+        Ensure all URLs that have not been explicitly excluded are present in
+        self.covered_urls.
+
+        If instant_crawl_depth is set, pages found by following links that
+        would cover what's missing are suggested.
+        """
+
+        clear_url_caches()
+
+        patterns = get_urlpatterns()
+        seen_patterns = set(self._get_matched_patterns(
+            list(self.covered_urls) + list(self.uncovered_urls)).values())
 
         all_patterns = extract_all_patterns_from_urlpatterns(
             patterns, self.uncovered_includes)
@@ -193,69 +1443,137 @@ class InstantCoverageMixin(InstantCoverageAPI):
         not_accounted_for = [p for p in all_patterns
                              if p[1] not in seen_patterns]
 
-        if not_accounted_for:
-            raise self.failureException(
-                'The following views are untested:\n\n{0}\n\n{1}'.format(
-                    '\n'.join([
-                        '{base} {route} ({name})'.format(
-                            base=base, name=pattern.name, route=(
-                                getattr(pattern.pattern, '_route', None) or
-                                getattr(pattern.pattern, '_regex', '-')
-                                if django.VERSION >= (2, 0)
-                                else pattern._regex
-                            ),
-                        ) for base, pattern in not_accounted_for
-                    ]),
-                    IGNORE_TUTORIAL.format(name=self.__class__.__name__),
-                )
+        untested = OrderedDict((
+            '{base} {route} ({name})'.format(
+                base=base, name=pattern.name, route=(
+                    getattr(pattern.pattern, '_route', None) or
+                    getattr(pattern.pattern, '_regex', '-')
+                    if django.VERSION >= (2, 0)
+                    else pattern._regex
+                ),
+            ), pattern) for base, pattern in not_accounted_for
+        )
+
+        new = set(f.detail for f in self.new_findings('all_urls_accounted_for', [
+            self.record_finding('all_urls_accounted_for', None, description)
+            for description in untested
+        ]))
+        untested = OrderedDict(
+            (d, pattern) for d, pattern in six.iteritems(untested) if d in new)
+
+        if not untested:
+            return
+
+        suggestions = {}  # type: Dict[URLPattern, str]
+
+        if self.instant_crawl_depth:
+            responses = self.instant_responses()
+            discovered = [url for url in self.instant_discovered_urls() if url in responses]
+
+            for url, pattern in six.iteritems(self._get_matched_patterns(discovered, quiet=True)):
+                suggestions.setdefault(pattern, url)
+
+        raise self.failureException(
+            'The following views are untested:\n\n{0}\n\n{1}'.format(
+                '\n'.join(self.summarise_report([
+                    description if pattern not in suggestions
+                    else '{0}, such as {1}, which was linked to from {2}'.format(
+                        description, suggestions[pattern],
+                        self.instant_discovered_urls()[suggestions[pattern]][0],
+                    )
+                    for description, pattern in six.iteritems(untested)
+                ])),
+                IGNORE_TUTORIAL.format(name=self.__class__.__name__),
             )
+        )
 
     def test_no_errors(self):  # type: () -> None
         """
         Ensure no URLs raise unhandled exceptions that would cause 500s.
+
+        Errors that look the same (the same type of exception, raised from the
+        same place, with a similar message) are reported together.
+
+        URLs are checked as each of instant_personas.
         """
 
-        errors = self.instant_errors()
+        errors = self._each_persona('errors')
 
-        if errors:
-            if self.instant_tracebacks:
-                raise self.failureException(
-                    'The following errors were raised:\n\n{0}'.format(
-                        '\n'.join(['{0}: {1}\n{2}'.format(
-                            url, error[0], ''.join(
-                                traceback.format_exception(*error)
-                            )
-                        ) for url, error in six.iteritems(errors)])
-                    )
-                )
+        new = set(f.url for f in self.new_findings('no_errors', [
+            self.record_finding(
+                'no_errors', url, '{0}: {1}'.format(error.exc_type, error.message),
+                baseline_key=error.baseline_signature,
+            )
+            for url, error in errors
+        ]))
+        clusters = cluster_errors(
+            (url, error) for url, error in errors if url in new
+        )
+
+        if not clusters:
+            return
+
+        entries = []
+
+        for cluster in clusters:
+            url, error = cluster[0]
+
+            if not self.instant_tracebacks:
+                entry = '{0}: {1}'.format(url, error.message)
+            elif error.traceback is not None:
+                entry = '{0}: {1}\n{2}'.format(url, error.exc_type, error.traceback)
             else:
-                raise self.failureException(
-                    'The following errors were raised:\n\n{0}\n\n{1}'
+                entry = '{0}: {1}: {2}\n(traceback omitted; raised from {3})\n'.format(
+                    url, error.exc_type, error.message, error.location)
+
+            if len(cluster) > 1:
+                entry += (
+                    '{0}  ...and the same error on {1} more URL{2}, including {3}'
                     .format(
-                        '\n'.join(['{0}: {1}'.format(url, error[1])
-                                   for url, error in six.iteritems(errors)]),
-                        INSTANT_TRACEBACKS_TUTORIAL.format(
-                            name=self.__class__.__name__),
+                        '' if entry.endswith('\n') else '\n',
+                        len(cluster) - 1, '' if len(cluster) == 2 else 's',
+                        ', '.join(u for u, e in cluster[1:ERROR_CLUSTER_SAMPLES + 1]),
                     )
                 )
 
+            entries.append(entry)
+
+        raise self.failureException(
+            'The following errors were raised:\n\n{0}{1}{2}'.format(
+                '\n'.join(self.summarise_report(entries)),
+                self._describe_skipped_urls(),
+                '' if self.instant_tracebacks else '\n\n' +
+                INSTANT_TRACEBACKS_TUTORIAL.format(name=self.__class__.__name__),
+            )
+        )
+
     def test_acceptable_status_codes(self):  # type: () -> None
         """
-        Ensure all URLs return responses with status codes between 200 and 399.
+        Ensure all URLs return responses with status codes between 200 and 399,
+        as each of instant_personas.
         """
 
         bad_status_codes = {}
 
-        for url, response in six.iteritems(self.instant_responses()):
+        for url, response in self._each_persona('responses'):
             if not 200 <= response.status_code < 400:
                 bad_status_codes[url] = response.status_code
 
+        new = set(f.url for f in self.new_findings('acceptable_status_codes', [
+            self.record_finding('acceptable_status_codes', url, six.text_type(status))
+            for url, status in six.iteritems(bad_status_codes)
+        ]))
+        bad_status_codes = dict(
+            (url, status) for url, status in six.iteritems(bad_status_codes)
+            if url in new
+        )
+
         if bad_status_codes:
             raise self.failureException(
                 'The following bad status codes were seen:\n\n{0}'.format(
-                    '\n'.join([
+                    '\n'.join(self.summarise_report([
                         '{0}: {1}'.format(url, status)
                         for url, status in six.iteritems(bad_status_codes)
-                    ])
+                    ]))
                 )
             )
@@ -0,0 +1,90 @@
+"""
+Keeping the responses each test class loads for as long as they're useful,
+and no longer.
+"""
+
+import sys
+from collections import OrderedDict
+
+if sys.version_info >= (3, 6):
+    from typing import Any, List, Optional, Tuple, Type  # noqa: F401
+    from .type_utils import InstantCacheDict, TestHttpResponse  # noqa: F401
+
+
+def response_size(response):  # type: (TestHttpResponse) -> int
+    """
+    Return roughly how many bytes keeping response around costs us: its body
+    and headers. Streaming responses have already been consumed, so count as
+    nothing.
+    """
+
+    if getattr(response, 'streaming', False):
+        return 0
+
+    return len(response.content) + sum(
+        len(header) + len(value) for header, value in response.items())
+
+
+def cache_size(cache):  # type: (InstantCacheDict) -> int
+    return sum(
+        response_size(response)
+        for responses in (cache['responses'], cache['redirect_targets'])
+        for response in responses.values()
+    )
+
+
+class ResponseCache(object):
+    """
+    What each test class (and persona) loaded, keyed by (class, persona) and
+    kept in the order they were last used, with a note of roughly how big
+    each one is.
+    """
+
+    def __init__(self):  # type: () -> None
+        self.entries = OrderedDict()  # type: OrderedDict[Tuple[Type, Optional[str]], Tuple[InstantCacheDict, int]]
+
+    @property
+    def size(self):  # type: () -> int
+        return sum(size for cache, size in self.entries.values())
+
+    def get(self, klass, persona):  # type: (Type, Optional[str]) -> Optional[InstantCacheDict]
+        key = (klass, persona)
+        if key not in self.entries:
+            return None
+
+        entry = self.entries.pop(key)
+        self.entries[key] = entry
+        return entry[0]
+
+    def set(
+        self, klass, persona, cache, max_bytes=None,
+    ):  # type: (Type, Optional[str], InstantCacheDict, Optional[int]) -> None
+        """
+        Keep cache for klass and persona. If that takes us over max_bytes,
+        drop what other classes loaded, least recently used first, until it
+        doesn't. We never drop klass's own caches to make room, since its
+        tests are about to go through each of them.
+        """
+
+        key = (klass, persona)
+        self.entries.pop(key, None)
+        self.entries[key] = (cache, cache_size(cache))
+
+        if max_bytes is None:
+            return
+
+        size = self.size
+        for evicted_key in [other for other in self.entries if other[0] is not klass]:
+            if size <= max_bytes:
+                break
+            size -= self.entries.pop(evicted_key)[1]
+
+    def for_class(self, klass):  # type: (Type) -> List[InstantCacheDict]
+        return [
+            cache for (cached_class, persona), (cache, size) in self.entries.items()
+            if cached_class is klass
+        ]
+
+    def release(self, klass):  # type: (Type) -> None
+        for key in [key for key in self.entries if key[0] is klass]:
+            del self.entries[key]
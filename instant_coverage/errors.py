@@ -0,0 +1,234 @@
+"""
+Lightweight records of exceptions raised while loading covered URLs.
+
+Keeping hold of sys.exc_info() for every broken page keeps every frame of
+every traceback (and everything those frames refer to) alive for as long as
+the responses are cached, so we boil exceptions down to text as soon as we
+catch them.
+"""
+
+import copy
+import hashlib
+import os
+import re
+import sys
+import traceback
+from collections import OrderedDict
+
+import six
+
+if sys.version_info >= (3, 6):
+    from typing import TYPE_CHECKING
+    if TYPE_CHECKING:
+        from typing import Iterable, List, Optional, Tuple  # noqa: F401
+        from .type_utils import ERROR_TYPE  # noqa: F401
+
+
+# bits of exception messages that tend to vary between otherwise identical
+# errors: memory addresses, quoted values and numbers
+_MESSAGE_VARIABLES = re.compile(
+    r"""0x[0-9a-fA-F]+|'[^']*'|"[^"]*"|\b\d+(?:\.\d+)?\b""",
+)
+
+
+def message_template(message):  # type: (str) -> str
+    """
+    Return message with the bits that vary between occurrences of what is
+    probably the same problem replaced with placeholders.
+    """
+
+    return _MESSAGE_VARIABLES.sub('<*>', message)
+
+
+def error_signature(exc_type, message, location):  # type: (str, str, str) -> str
+    """
+    Return a short hash that should be the same for every occurrence of an
+    error, whatever page it happened on.
+    """
+
+    return hashlib.sha1(u'\0'.join([
+        exc_type, message_template(message), location,
+    ]).encode('utf-8')).hexdigest()[:12]
+
+
+def project_path(filename):  # type: (str) -> str
+    """
+    Return filename relative to the entry of sys.path it was imported from,
+    so that it's the same wherever the project is checked out.
+    """
+
+    filename = os.path.abspath(filename)
+    roots = [
+        os.path.join(os.path.abspath(entry or os.curdir), '')
+        for entry in sys.path
+    ]
+    matching = [root for root in roots if filename.startswith(root)]
+
+    if not matching:
+        return os.path.basename(filename)
+
+    return os.path.relpath(filename, max(matching, key=len)).replace(os.sep, '/')
+
+
+class ErrorGroup(object):
+    """
+    Errors of the same type raised from the same place.
+    """
+
+    def __init__(self, key, exc_type, location):  # type: (Tuple[str, ...], str, str) -> None
+        self.key = key
+        self.exc_type = exc_type
+        self.location = location
+        self.count = 0
+
+
+class CapturedError(object):
+    """
+    What we keep of an exception raised while loading a URL: the name of its
+    type, its message, where it came from and, for the first few in each
+    group, the formatted traceback.
+
+    signature groups errors within a run. baseline_signature leaves out line
+    numbers and where the project is checked out, so that it stays the same
+    between runs on different machines and as the code around it changes.
+    """
+
+    def __init__(
+        self, exc_type, message, key, location, traceback=None, origin='?',
+    ):  # type: (str, str, Tuple[str, ...], str, Optional[str], str) -> None
+        self.exc_type = exc_type
+        self.message = message
+        self.key = key
+        self.location = location
+        self.origin = origin
+        self.traceback = traceback
+        self.signature = error_signature(exc_type, message, location)
+        self.baseline_signature = error_signature(exc_type, message, origin)
+
+    def __str__(self):  # type: () -> str
+        return self.message
+
+    def __repr__(self):  # type: () -> str
+        return '<CapturedError {0}: {1}>'.format(self.exc_type, self.message)
+
+
+def _describe_exception(exc_info):  # type: (ERROR_TYPE) -> Tuple[str, str, str, str]
+    exc_type, exc_value, tb = exc_info
+
+    innermost = tb
+    while innermost is not None and innermost.tb_next is not None:
+        innermost = innermost.tb_next
+
+    if innermost is None:
+        location = origin = '?'
+    else:
+        code = innermost.tb_frame.f_code
+        location = '{0}:{1} in {2}'.format(
+            code.co_filename, innermost.tb_lineno, code.co_name)
+        origin = '{0} in {1}'.format(project_path(code.co_filename), code.co_name)
+
+    module = getattr(exc_type, '__module__', None)
+    type_name = getattr(exc_type, '__name__', repr(exc_type))
+    if module not in (None, 'builtins', 'exceptions'):
+        type_name = '{0}.{1}'.format(module, type_name)
+
+    try:
+        message = six.text_type(exc_value)
+    except Exception:
+        message = repr(exc_value)
+
+    return type_name, message, location, origin
+
+
+def cluster_errors(errors):  # type: (Iterable[Tuple[str, CapturedError]]) -> List[List[Tuple[str, CapturedError]]]
+    """
+    Group (url, error) pairs by the signatures of the errors, in the order
+    each signature was first seen.
+    """
+
+    clusters = OrderedDict()  # type: OrderedDict[str, List[Tuple[str, CapturedError]]]
+    for url, error in errors:
+        clusters.setdefault(error.signature, []).append((url, error))
+    return list(clusters.values())
+
+
+class ErrorCollector(object):
+    """
+    Capture exceptions as CapturedErrors, keeping full tracebacks for only
+    the first tracebacks_per_group of each ErrorGroup.
+    """
+
+    def __init__(self, tracebacks_per_group=0):  # type: (int) -> None
+        self.tracebacks_per_group = tracebacks_per_group
+        self.groups = OrderedDict()  # type: OrderedDict[Tuple[str, ...], ErrorGroup]
+
+    def _group_for(self, error):  # type: (CapturedError) -> ErrorGroup
+        if error.key not in self.groups:
+            self.groups[error.key] = ErrorGroup(
+                error.key, error.exc_type, error.location)
+        group = self.groups[error.key]
+        group.count += 1
+        return group
+
+    def capture(self, exc_info):  # type: (ERROR_TYPE) -> CapturedError
+        type_name, message, location, origin = _describe_exception(exc_info)
+        key = (type_name, location)
+        error = CapturedError(type_name, message, key, location, origin=origin)
+
+        if self._group_for(error).count <= self.tracebacks_per_group:
+            error.traceback = ''.join(traceback.format_exception(*exc_info))
+
+        return error
+
+    def adopt(self, error):  # type: (CapturedError) -> CapturedError
+        """
+        Take on an error captured by some other collector (in a forked worker,
+        for instance), dropping its traceback if we already have enough.
+        """
+
+        if self._group_for(error).count > self.tracebacks_per_group:
+            error.traceback = None
+
+        return error
+
+    def error(self, exc_type, message):  # type: (str, str) -> CapturedError
+        """
+        Make a CapturedError for a problem that didn't come with an exception.
+        """
+
+        return self.adopt(CapturedError(exc_type, message, (exc_type, '?'), '?'))
+
+
+class CheckTraceback(Exception):
+    """
+    Where an exception that an instant check raised, and that we've raised
+    again for a test that asked for that check's results, came from.
+    """
+
+
+def detach_exception(exc_info):  # type: (ERROR_TYPE) -> Tuple[BaseException, str]
+    """
+    Return the exception in exc_info without its traceback, along with the
+    traceback formatted as text, so that the exception can be kept around
+    without keeping every frame it was raised through alive too.
+    """
+
+    exception = exc_info[1]
+    assert exception is not None
+    formatted = ''.join(traceback.format_exception(*exc_info))
+
+    if hasattr(exception, '__traceback__'):
+        exception.__traceback__ = None
+        exception.__context__ = exception.__cause__ = None
+
+    return exception, formatted
+
+
+def reraise_detached(exception, formatted):  # type: (BaseException, str) -> None
+    """
+    Raise a copy of an exception from detach_exception, from a CheckTraceback
+    of where it originally came from. The copy gets the new traceback, so the
+    exception we were given stays detached.
+    """
+
+    six.raise_from(copy.copy(exception), CheckTraceback(formatted))
@@ -0,0 +1,215 @@
+"""
+Structured records of the problems our tests find, for tools that would
+rather not parse failure messages.
+"""
+
+import atexit
+import hashlib
+import io
+import json
+import os
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+
+import six
+
+if sys.version_info >= (3, 6):
+    from typing import Dict, Iterable, Iterator, List, Optional, Set  # noqa: F401
+
+
+#: a single problem found by a single check, on a single URL
+Finding = namedtuple('Finding', [
+    'url', 'check', 'severity', 'detail', 'timing', 'fingerprint',
+])
+
+
+def fingerprint(check, url, key):  # type: (str, Optional[str], str) -> str
+    """
+    Return a short hash identifying a finding across runs.
+    """
+
+    return hashlib.sha1(u'\0'.join([
+        check, url or u'', key,
+    ]).encode('utf-8')).hexdigest()[:12]
+
+
+class JSONLinesSink(object):
+    """
+    Write findings to a file as they're recorded, one JSON object per line,
+    flushing after each so that nothing's lost if the run is cut short.
+    """
+
+    def __init__(self, path):  # type: (str) -> None
+        self.path = path
+        self.file = io.open(path, 'w', encoding='utf-8')
+
+    def write(self, finding):  # type: (Finding) -> None
+        line = json.dumps(dict(finding._asdict()), ensure_ascii=False)
+        self.file.write(six.ensure_text(line) + u'\n')
+        self.file.flush()
+
+    def close(self):  # type: () -> None
+        self.file.close()
+
+
+_sinks = {}  # type: Dict[str, JSONLinesSink]
+
+
+def get_process_path(path):  # type: (str) -> str
+    """
+    Return path, or, in a worker process of a parallel test run (pytest-xdist
+    or anything built on multiprocessing, like django's --parallel), path
+    with the name of the worker added before its extension, so that workers
+    don't empty and overwrite each other's files.
+    """
+
+    worker = os.environ.get('PYTEST_XDIST_WORKER')
+    if not worker and 'multiprocessing' in sys.modules:
+        # if nothing's imported multiprocessing, we can't be one of its workers
+        import multiprocessing
+        if multiprocessing.current_process().name != 'MainProcess':
+            worker = str(os.getpid())
+
+    if not worker:
+        return path
+
+    root, extension = os.path.splitext(path)
+    return '{0}.{1}{2}'.format(root, worker, extension)
+
+
+def get_sink(path):  # type: (str) -> JSONLinesSink
+    """
+    Return the sink for path (see get_process_path). The file is emptied the
+    first time it's asked for in a given process, and appended to by every
+    test after that.
+    """
+
+    if path not in _sinks:
+        _sinks[path] = JSONLinesSink(get_process_path(path))
+
+    return _sinks[path]
+
+
+@contextmanager
+def _locked(path):  # type: (str) -> Iterator[None]
+    """
+    Hold an exclusive lock on path + '.lock', on platforms with fcntl.
+    """
+
+    try:
+        import fcntl
+    except ImportError:  # windows
+        yield
+        return
+
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class Baseline(object):
+    """
+    A record of findings we already know about, stored in path as the
+    fingerprints of each check's findings for each URL.
+
+    Several processes (pytest-xdist workers, say) can update the same
+    baseline: each only replaces the (check, URL)s it has replaced itself,
+    and leaves whatever the others have saved alone.
+    """
+
+    def __init__(self, path):  # type: (str) -> None
+        self.path = path
+        self.index = self._read()
+        self.replaced = {}  # type: Dict[str, Set[str]]
+
+    def _read(self):  # type: () -> Dict[str, Dict[str, Set[str]]]
+        index = {}  # type: Dict[str, Dict[str, Set[str]]]
+
+        if os.path.exists(self.path):
+            with io.open(self.path, encoding='utf-8') as baseline_file:
+                data = json.load(baseline_file)
+            for check, urls in data['findings'].items():
+                index[check] = dict(
+                    (url, set(fingerprints)) for url, fingerprints in urls.items()
+                )
+
+        return index
+
+    def new_findings(self, check, findings):  # type: (str, Iterable[Finding]) -> List[Finding]
+        """
+        Return the findings of check that aren't in this baseline.
+        """
+
+        findings = list(findings)
+        known_for_check = self.index.get(check, {})
+        urls = set(f.url or u'' for f in findings)
+        known = set(
+            (url, fp) for url in urls for fp in known_for_check.get(url, ())
+        )
+        new = set((f.url or u'', f.fingerprint) for f in findings) - known
+        return [f for f in findings if (f.url or u'', f.fingerprint) in new]
+
+    def replace(
+        self, check, urls, findings,
+    ):  # type: (str, Iterable[Optional[str]], Iterable[Finding]) -> None
+        """
+        Forget what we knew about check on urls, and remember findings
+        instead.
+        """
+
+        known_for_check = self.index.setdefault(check, {})
+        replaced = self.replaced.setdefault(check, set())
+        for url in urls:
+            known_for_check.pop(url or u'', None)
+            replaced.add(url or u'')
+        for finding in findings:
+            known_for_check.setdefault(finding.url or u'', set()).add(finding.fingerprint)
+            replaced.add(finding.url or u'')
+
+    def save(self):  # type: () -> None
+        """
+        Write what we've replaced over whatever is in path now, which other
+        processes might have changed since we read it.
+        """
+
+        with _locked(self.path):
+            index = self._read()
+            for check, urls in self.replaced.items():
+                ours, theirs = self.index.get(check, {}), index.setdefault(check, {})
+                for url in urls:
+                    theirs.pop(url, None)
+                    if ours.get(url):
+                        theirs[url] = ours[url]
+            self.index = index
+
+            data = {'version': 1, 'findings': dict(
+                (check, dict(
+                    (url, sorted(fingerprints))
+                    for url, fingerprints in sorted(urls.items()) if fingerprints
+                )) for check, urls in self.index.items()
+            )}
+            temporary_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+            with io.open(temporary_path, 'w', encoding='utf-8') as baseline_file:
+                baseline_file.write(six.ensure_text(
+                    json.dumps(data, sort_keys=True, separators=(',', ':'))))
+            getattr(os, 'replace', os.rename)(temporary_path, self.path)
+
+
+_baselines = {}  # type: Dict[str, Baseline]
+
+
+def get_baseline(path):  # type: (str) -> Baseline
+    if path not in _baselines:
+        _baselines[path] = Baseline(path)
+
+    return _baselines[path]
+
+
+@atexit.register
+def _close_sinks():  # type: () -> None
+    for sink in _sinks.values():
+        sink.close()
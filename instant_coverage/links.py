@@ -0,0 +1,124 @@
+"""
+Pulling URLs out of HTML in one pass over the markup, without building a
+document tree.
+"""
+
+import re
+import sys
+
+from six.moves.html_parser import HTMLParser
+
+if sys.version_info >= (3, 6):
+    from typing import List, Optional, Tuple  # noqa: F401
+    from .type_utils import TestHttpResponse  # noqa: F401
+
+
+#: attributes that contain a single URL
+URL_ATTRIBUTES = frozenset([
+    'action', 'background', 'cite', 'data', 'formaction', 'href', 'icon',
+    'longdesc', 'manifest', 'poster', 'src',
+])
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)(.*?)\1\s*\)''', re.IGNORECASE)
+_REFRESH_URL = re.compile(r'''^\s*\d*(?:\.\d*)?\s*[;,]\s*url\s*=\s*(['"]?)(.*?)\1\s*$''', re.IGNORECASE)
+
+
+def _srcset_urls(srcset):  # type: (str) -> List[str]
+    urls = []
+    for candidate in srcset.split(','):
+        parts = candidate.split()
+        if parts:
+            urls.append(parts[0])
+    return urls
+
+
+class LinkExtractor(HTMLParser):
+    """
+    Collect (tag, attribute, url) for every URL referred to in a document:
+    in URL attributes, srcset, inline style and <style> elements, and
+    <meta http-equiv="refresh">.
+    """
+
+    def __init__(self):  # type: () -> None
+        HTMLParser.__init__(self)
+        self.urls = []  # type: List[Tuple[str, str, str]]
+        self._in_style = False
+
+    def _add(self, tag, attribute, url):  # type: (str, str, Optional[str]) -> None
+        url = (url or '').strip()
+        if url:
+            self.urls.append((tag, attribute, url))
+
+    def handle_starttag(self, tag, attrs):  # type: (str, List[Tuple[str, Optional[str]]]) -> None
+        if tag == 'style':
+            self._in_style = True
+
+        for attribute, value in attrs:
+            if value is None:
+                continue
+            elif attribute in URL_ATTRIBUTES:
+                self._add(tag, attribute, value)
+            elif attribute in ('srcset', 'imagesrcset'):
+                for url in _srcset_urls(value):
+                    self._add(tag, attribute, url)
+            elif attribute == 'style':
+                for quote, url in _CSS_URL.findall(value):
+                    self._add(tag, attribute, url)
+
+        if tag == 'meta':
+            attributes = dict(attrs)
+            if (attributes.get('http-equiv') or '').lower() == 'refresh':
+                match = _REFRESH_URL.match(attributes.get('content') or '')
+                if match:
+                    self._add(tag, 'content', match.group(2))
+
+    def handle_startendtag(self, tag, attrs):  # type: (str, List[Tuple[str, Optional[str]]]) -> None
+        self.handle_starttag(tag, attrs)
+        if tag == 'style':
+            self._in_style = False
+
+    def handle_endtag(self, tag):  # type: (str) -> None
+        if tag == 'style':
+            self._in_style = False
+
+    def handle_data(self, data):  # type: (str) -> None
+        if self._in_style:
+            for quote, url in _CSS_URL.findall(data):
+                self._add('style', 'style', url)
+
+
+def response_text(response):  # type: (TestHttpResponse) -> str
+    """
+    Return the content of response as text, decoded with its charset.
+    """
+
+    charset = getattr(response, 'charset', None) or 'utf-8'
+    try:
+        return response.content.decode(charset, 'replace')
+    except LookupError:
+        return response.content.decode('utf-8', 'replace')
+
+
+def extract_urls(html):  # type: (str) -> List[Tuple[str, str, str]]
+    """
+    Return (tag, attribute, url) for every URL referred to in html.
+    """
+
+    extractor = LinkExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.urls
+
+
+def is_external(url):  # type: (str) -> bool
+    return url.startswith(('http:', 'https:', '//'))
+
+
+def absolute_external_url(url, scheme='https'):  # type: (str, str) -> str
+    """
+    Give protocol-relative URLs a scheme, so that we can request them.
+    """
+
+    if url.startswith('//'):
+        return '{0}:{1}'.format(scheme, url)
+    return url
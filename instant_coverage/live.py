@@ -0,0 +1,142 @@
+"""
+Loading covered URLs over HTTP from a real server, rather than with the test
+client.
+"""
+
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+from timeit import default_timer
+
+from django.core.signals import got_request_exception
+
+from six.moves.urllib.parse import urljoin, urlsplit, urlunsplit
+
+from . import _rebuild_response
+
+if sys.version_info >= (3, 6):
+    from typing import TYPE_CHECKING
+    if TYPE_CHECKING:
+        from typing import Any, Dict, List, Optional, Sequence, Tuple  # noqa: F401
+        import requests  # noqa: F401
+        from . import InstantCoverageAPI  # noqa: F401
+        from .errors import CapturedError  # noqa: F401
+        from .type_utils import InstantCacheDict, TestHttpResponse  # noqa: F401
+
+
+#: headers that describe how a response got to us rather than the response
+#: itself; requests has already dealt with them
+HOP_BY_HOP_HEADERS = frozenset([
+    'connection', 'content-encoding', 'content-length', 'keep-alive',
+    'transfer-encoding',
+])
+
+
+def local_url(base_url, url):  # type: (str, str) -> str
+    """
+    Return url as a path (and query) if it's on the server at base_url, or
+    untouched if it isn't.
+    """
+
+    base, target = urlsplit(base_url), urlsplit(urljoin(base_url, url))
+    if (target.scheme, target.netloc) != (base.scheme, base.netloc):
+        return url
+    return urlunsplit(('', '', target.path, target.query, ''))
+
+
+class LiveCrawl(object):
+    """
+    Load covered URLs from the server at base_url for test, workers at a time.
+    Each worker thread has a requests session of its own, so connections to
+    the server get reused.
+
+    Exceptions raised by views in this process (as they are on a
+    LiveServerTestCase's server) are captured as errors, just as they would
+    be with the test client. A server in another process can only tell us
+    that it responded with a 500.
+    """
+
+    def __init__(
+        self, test, base_url, workers, cache, deadline,
+    ):  # type: (InstantCoverageAPI, str, int, InstantCacheDict, Optional[float]) -> None
+        self.test = test
+        self.base_url = base_url
+        self.workers = workers
+        self.cache = cache
+        self.deadline = deadline
+
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.sessions = []  # type: List[requests.Session]
+        self.view_errors = {}  # type: Dict[str, CapturedError]
+
+    def _session(self):  # type: () -> requests.Session
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self.test.get_live_session()
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def _capture_view_error(self, sender, request=None, **kwargs):  # type: (Any, Any, **Any) -> None
+        if request is None:
+            return
+
+        with self.lock:
+            self.view_errors[request.get_full_path()] = (
+                self.cache['error_collector'].capture(sys.exc_info()))
+
+    def _rebuild(self, response):  # type: (requests.Response) -> TestHttpResponse
+        return _rebuild_response(
+            response.status_code,
+            [
+                (header, value) for header, value in response.headers.items()
+                if header.lower() not in HOP_BY_HOP_HEADERS
+            ],
+            response.content,
+            [
+                (local_url(self.base_url, urljoin(r.url, r.headers['Location'])), r.status_code)
+                for r in response.history if 'Location' in r.headers
+            ],
+        )
+
+    def fetch(self, url):  # type: (str) -> None
+        cache = self.cache
+
+        with self.lock:
+            if self.test._crawl_should_stop(len(cache['errors']), self.deadline):
+                cache['skipped'].append(url)
+                return
+
+        started = default_timer()
+
+        try:
+            response = self.test.attempt_to_get_live_url(
+                self._session(), urljoin(self.base_url, url))
+        except Exception:
+            with self.lock:
+                cache['errors'][url] = cache['error_collector'].capture(sys.exc_info())
+        else:
+            with self.lock:
+                view_error = self.view_errors.pop(local_url(self.base_url, response.url), None)
+
+                if view_error is not None and response.status_code >= 500:
+                    cache['errors'][url] = view_error
+                else:
+                    rebuilt = self._rebuild(response)
+                    cache['responses'][url] = rebuilt
+                    self.test._record_redirects(url, rebuilt, cache)
+
+        cache['timings'][url] = default_timer() - started
+
+    def run(self, urls):  # type: (Sequence[str]) -> None
+        got_request_exception.connect(self._capture_view_error)
+        pool = ThreadPool(max(1, min(self.workers, len(urls))))
+        try:
+            pool.map(self.fetch, urls)
+        finally:
+            pool.close()
+            pool.join()
+            got_request_exception.disconnect(self._capture_view_error)
+            for session in self.sessions:
+                session.close()
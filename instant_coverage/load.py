@@ -0,0 +1,272 @@
+"""
+Replaying covered URLs as a load test.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+from timeit import default_timer
+
+import six
+
+if sys.version_info >= (3, 6):
+    from typing import TYPE_CHECKING
+    if TYPE_CHECKING:
+        from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple  # noqa: F401
+        from . import InstantCoverageAPI  # noqa: F401
+
+
+#: the percentiles reported for each URL pattern
+LOAD_TEST_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram(object):
+    """
+    Counts of latencies in logarithmic buckets, each split into linear ones,
+    in the manner of an HDR histogram. Values are stored in microseconds, as
+    the lower bound of their bucket, which is within 1 / 2 **
+    (sub_bucket_bits - 1) of their actual value however large or small they
+    are; percentiles are reported the same way.
+    """
+
+    def __init__(self, sub_bucket_bits=7):  # type: (int) -> None
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = {}  # type: Dict[Tuple[int, int], int]
+        self.count = 0
+        self.total = 0
+        self.min = None  # type: Optional[int]
+        self.max = None  # type: Optional[int]
+
+    def _bucket(self, value):  # type: (int) -> Tuple[int, int]
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return shift, value >> shift
+
+    def record(self, seconds):  # type: (float) -> None
+        value = max(0, int(round(seconds * 1e6)))
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):  # type: (LatencyHistogram) -> None
+        for bucket, count in six.iteritems(other.counts):
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for attr, pick in (('min', min), ('max', max)):
+            theirs = getattr(other, attr)
+            if theirs is not None:
+                ours = getattr(self, attr)
+                setattr(self, attr, theirs if ours is None else pick(ours, theirs))
+
+    def buckets(self):  # type: () -> List[Tuple[int, int]]
+        """
+        Return (microseconds, count) for each bucket with anything in it,
+        shortest first.
+        """
+
+        return [
+            (sub << shift, count)
+            for (shift, sub), count in sorted(self.counts.items(), key=lambda i: i[0][1] << i[0][0])
+        ]
+
+    def percentile(self, percent):  # type: (float) -> Optional[int]
+        """
+        Return the latency, in microseconds, that percent of recorded values
+        were at or below.
+        """
+
+        if not self.count:
+            return None
+
+        threshold = self.count * percent / 100.0
+        seen = 0
+        for value, count in self.buckets():
+            seen += count
+            if seen >= threshold:
+                return min(value, self.max) if self.max is not None else value
+
+        return self.max
+
+    def mean(self):  # type: () -> Optional[float]
+        return self.total / float(self.count) if self.count else None
+
+
+class PatternLoad(object):
+    """
+    What happened to the requests made for URLs matching one URL pattern.
+    """
+
+    def __init__(self, pattern):  # type: (str) -> None
+        self.pattern = pattern
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+
+    @property
+    def requests(self):  # type: () -> int
+        return self.histogram.count
+
+    @property
+    def error_rate(self):  # type: () -> float
+        return self.errors / float(self.requests) if self.requests else 0.0
+
+    def as_dict(self):  # type: () -> Dict[str, Any]
+        return {
+            'pattern': self.pattern,
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.error_rate,
+            'mean_us': self.histogram.mean(),
+            'min_us': self.histogram.min,
+            'max_us': self.histogram.max,
+            'percentiles_us': dict(
+                (six.text_type(p), self.histogram.percentile(p)) for p in LOAD_TEST_PERCENTILES),
+            'histogram_us': self.histogram.buckets(),
+        }
+
+
+class LoadTestReport(object):
+    """
+    The results of a load test: requests per second overall, and a
+    PatternLoad for each URL pattern.
+    """
+
+    def __init__(self, concurrency):  # type: (int) -> None
+        self.concurrency = concurrency
+        self.patterns = OrderedDict()  # type: OrderedDict[str, PatternLoad]
+        self.duration = 0.0
+
+    @property
+    def requests(self):  # type: () -> int
+        return sum(p.requests for p in self.patterns.values())
+
+    @property
+    def errors(self):  # type: () -> int
+        return sum(p.errors for p in self.patterns.values())
+
+    @property
+    def requests_per_second(self):  # type: () -> float
+        return self.requests / self.duration if self.duration else 0.0
+
+    def as_dict(self):  # type: () -> Dict[str, Any]
+        return {
+            'concurrency': self.concurrency,
+            'duration': self.duration,
+            'requests': self.requests,
+            'errors': self.errors,
+            'requests_per_second': self.requests_per_second,
+            'patterns': [p.as_dict() for p in self.patterns.values()],
+        }
+
+    def format(self):  # type: () -> str
+        def ms(value):  # type: (Optional[float]) -> str
+            return '-' if value is None else '{0:.1f}'.format(value / 1000.0)
+
+        lines = [
+            '{0} requests in {1:.2f}s at concurrency {2}: {3:.1f} requests/s, {4} errors'
+            .format(self.requests, self.duration, self.concurrency,
+                    self.requests_per_second, self.errors),
+            '',
+            '{0:>8} {1:>7} {2:>8} {3} {4:>8}  {5}'.format(
+                'requests', 'errors', 'mean ms',
+                ' '.join('{0:>8}'.format('p{0}'.format(p)) for p in LOAD_TEST_PERCENTILES),
+                'max ms', 'pattern'),
+        ]
+
+        for load in self.patterns.values():
+            lines.append('{0:>8} {1:>7} {2:>8} {3} {4:>8}  {5}'.format(
+                load.requests, load.errors, ms(load.histogram.mean()),
+                ' '.join('{0:>8}'.format(ms(load.histogram.percentile(p))) for p in LOAD_TEST_PERCENTILES),
+                ms(load.histogram.max), load.pattern,
+            ))
+
+        return '\n'.join(lines)
+
+
+class LoadRunner(object):
+    """
+    Request urls over and over, round robin, concurrency at a time, until
+    we've made max_requests requests or duration seconds have passed.
+
+    get_fetcher is called once in each worker thread, and should return a
+    function that loads a URL and returns its status code.
+    """
+
+    def __init__(
+        self, urls, patterns, get_fetcher, concurrency=1, duration=None, max_requests=None,
+    ):  # type: (Sequence[str], Dict[str, str], Callable[[], Callable[[str], int]], int, Optional[float], Optional[int]) -> None  # noqa: E501
+        if duration is None and max_requests is None:
+            raise ValueError('A load test needs a duration or a number of requests to make.')
+
+        self.urls = list(urls)
+        self.patterns = patterns
+        self.get_fetcher = get_fetcher
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+
+        self.lock = threading.Lock()
+        self.issued = 0
+        self.deadline = None  # type: Optional[float]
+        self.report = LoadTestReport(concurrency)
+
+        for url in self.urls:
+            pattern = patterns[url]
+            if pattern not in self.report.patterns:
+                self.report.patterns[pattern] = PatternLoad(pattern)
+
+    def _next_url(self):  # type: () -> Optional[str]
+        with self.lock:
+            if (
+                (self.max_requests is not None and self.issued >= self.max_requests) or
+                (self.deadline is not None and default_timer() >= self.deadline)
+            ):
+                return None
+
+            url = self.urls[self.issued % len(self.urls)]
+            self.issued += 1
+            return url
+
+    def _work(self, worker):  # type: (int) -> None
+        fetch = self.get_fetcher()
+
+        while True:
+            url = self._next_url()
+            if url is None:
+                return
+
+            started = default_timer()
+            try:
+                failed = fetch(url) >= 500
+            except Exception:
+                failed = True
+            elapsed = default_timer() - started
+
+            with self.lock:
+                load = self.report.patterns[self.patterns[url]]
+                load.histogram.record(elapsed)
+                load.errors += failed
+
+    def run(self):  # type: () -> LoadTestReport
+        if not self.urls:
+            return self.report
+
+        started = default_timer()
+        if self.duration is not None:
+            self.deadline = started + self.duration
+
+        if self.concurrency > 1:
+            pool = ThreadPool(self.concurrency)
+            try:
+                pool.map(self._work, range(self.concurrency))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            self._work(0)
+
+        self.report.duration = default_timer() - started
+        return self.report
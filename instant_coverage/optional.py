@@ -1,65 +1,205 @@
 """
 Optional mixins for testing stuff you might want to test.
 Include them as mixins in test classes that inherit from InstantCoverageMixin.
+
+Each test imports the libraries it needs when it runs, so that mixing in one
+of these doesn't cost you the import time of all the others.
 """
 
+import difflib
+import io
 import json
+import os
 import re
 import sys
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from contextlib import closing
 from pprint import pformat
 
-from bs4 import BeautifulSoup
-
 from django.conf import settings
 
-from html5lib import HTMLParser, constants
-import requests
 import six
+from six.moves.urllib.parse import unquote, urljoin, urlsplit
 
-from . import InstantCoverageAPI
+from . import InstantCoverageAPI, get_content_type, get_url_pattern_key, instant_check
+from .links import absolute_external_url, extract_urls, is_external, response_text
+from .politeness import PoliteScheduler
+from .queries import QueryCapture, allowed_databases
+from .snapshots import SNAPSHOT_NORMALISERS, SnapshotFile, snapshot_hash, snapshot_text
+from .text import index_words
 
 if sys.version_info >= (3, 6):
     from typing import TYPE_CHECKING
     if TYPE_CHECKING:
-        from typing import Any, Dict, List, Optional, Set, Union  # noqa: F401
+        from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union  # noqa: F401
+        import requests  # noqa: F401
+        from .findings import Finding  # noqa: F401
+        from .type_utils import TestHttpResponse  # noqa: F401
+
+
+def _discard(*args):  # type: (*Any) -> None
+    return None
+
+
+#: compiled validators, keyed by the id of the schema they were compiled from,
+#: along with the schema itself so that its id can't be reused
+_compiled_json_schemas = {}  # type: Dict[int, Tuple[Dict[str, Any], Any]]
+
+
+def validate_json(content):  # type: (bytes) -> None
+    """
+    Raise ValueError if content is not well-formed JSON encoded as UTF-8.
+    """
+
+    # json would take UTF-16 and UTF-32 too, if we let it decode bytes itself
+    text = content.decode('utf-8')
+
+    # objects and numbers collapse to None as soon as they're scanned, so we
+    # don't keep dicts or number objects for a big response only to throw
+    # them away; arrays and strings are still built as the scanner goes, so
+    # memory for string-heavy documents is much the same as json.loads
+    json.loads(text, object_pairs_hook=_discard,
+               parse_float=_discard, parse_int=_discard)
+
+
+def get_json_schema_validator(schema):  # type: (Dict[str, Any]) -> Any
+    """
+    Return a jsonschema validator for schema, compiling it only the first
+    time we see it.
+    """
+
+    key = id(schema)
+
+    if key not in _compiled_json_schemas:
+        try:
+            from jsonschema.validators import validator_for
+        except ImportError:
+            raise ImportError(
+                'Validating JSON schemas requires jsonschema.\n'
+                '`pip install jsonschema` should set you up.'
+            )
+
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        _compiled_json_schemas[key] = (schema, validator_class(schema))
+
+    return _compiled_json_schemas[key][1]
+
+
+def get_static_asset_index():  # type: () -> Dict[str, Tuple[Any, str]]
+    """
+    Return (storage, path) for every file the staticfiles finders can find,
+    keyed by the path it's served at relative to STATIC_URL. If
+    staticfiles_storage keeps a manifest of hashed names, those are included
+    too, pointing at the files they were made from.
+    """
+
+    from django.contrib.staticfiles.finders import get_finders
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    index = {}  # type: Dict[str, Tuple[Any, str]]
+
+    for finder in get_finders():
+        for path, storage in finder.list([]):
+            prefix = getattr(storage, 'prefix', None)
+            name = '/'.join([prefix, path]) if prefix else path
+            index.setdefault(name.replace(os.sep, '/'), (storage, path))
+
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if hashed_files:
+        for original, hashed in six.iteritems(hashed_files):
+            if original in index:
+                index.setdefault(hashed, index[original])
+
+    return index
+
+
+def static_asset_name(page_url, link, static_url):  # type: (str, str, Optional[str]) -> Optional[str]
+    """
+    Return the name of the static asset that link, on the page at page_url,
+    refers to, or None if it doesn't refer to one (which nothing does if
+    there's no static_url).
+    """
+
+    url = urljoin(page_url, link)
+    if not static_url or not url.startswith(static_url):
+        return None
+
+    return unquote(urlsplit(url[len(static_url):]).path) or None
 
 
 class ValidJSON(InstantCoverageAPI):
-    def test_valid_json(self):  # type: () -> None
+    #: JSON schemas to validate responses against, keyed by a regex that
+    #: should match the path of the URLs that schema applies to
+    json_schemas = {}  # type: Dict[str, Dict[str, Any]]
+
+    @instant_check('valid_json', content_types=['application/json'])
+    def check_valid_json(self, url, response):  # type: (str, TestHttpResponse) -> Optional[str]
         """
-        Ensure all responses with Content-Type: application/json are throwing
-        out valid JSON.
+        Return what's wrong with the JSON in response, if anything.
         """
 
-        bad_json = {}
-        json_seen = False
+        path = url.split('?')[0]
+        url_schemas = [
+            schema for pattern, schema in six.iteritems(self.json_schemas)
+            if re.search(pattern, path)
+        ]
 
-        for url, response in six.iteritems(self.instant_responses()):
-            if response['Content-Type'] != 'application/json':
-                continue
+        try:
+            if url_schemas:
+                content = json.loads(response.content.decode('utf-8'))
+            else:
+                validate_json(response.content)
+        except ValueError:
+            return six.text_type(sys.exc_info()[1])
 
-            json_seen = True
+        for schema in url_schemas:
+            validator = get_json_schema_validator(schema)
+            from jsonschema.exceptions import best_match
 
-            content = response.content.decode('utf-8')
+            error = best_match(validator.iter_errors(content))
+            if error is not None:
+                return 'does not match schema: {0}{1}'.format(
+                    error.message, ' (at {0})'.format(
+                        '/'.join(six.text_type(p) for p in error.absolute_path)
+                    ) if error.absolute_path else '',
+                )
 
-            try:
-                json.loads(content)
-            except ValueError:
-                bad_json[url] = sys.exc_info()
+        return None
+
+    def test_valid_json(self):  # type: () -> None
+        """
+        Ensure all responses with Content-Type: application/json are throwing
+        out valid JSON.
+
+        If you want to check the structure of the JSON as well, provide
+        schemas in `json_schemas`, keyed by a regex for the paths they apply
+        to; for instance `{r'^/api/': {'type': 'object'}}`. This requires
+        jsonschema.
+        """
+
+        results = self.instant_check_results('valid_json')
+        bad_json = dict(
+            (url, err) for url, err in six.iteritems(results) if err is not None)
+
+        new = set(f.url for f in self.new_findings('valid_json', [
+            self.record_finding('valid_json', url, six.text_type(err))
+            for url, err in six.iteritems(bad_json)
+        ]))
+        bad_json = dict(
+            (url, err) for url, err in six.iteritems(bad_json) if url in new)
 
         if bad_json:
             raise self.failureException(
                 'The following URLs returned invalid JSON:\n\n{0}'.format(
-                    '\n'.join([
-                        '{0}: {1}'.format(url, err[1])
+                    '\n'.join(self.summarise_report([
+                        '{0}: {1}'.format(url, err)
                         for url, err in six.iteritems(bad_json)
-                    ])
+                    ]))
                 )
             )
 
-        if not json_seen:
+        if not results:
             raise self.failureException(
                 "No views were found to serve up JSON. Ensure any views you "
                 "expect to return JSON set the Content-Type: header to "
@@ -68,66 +208,217 @@ class ValidJSON(InstantCoverageAPI):
 
 
 class ExternalLinks(InstantCoverageAPI):
+    #: how many external links to check at once
+    external_link_workers = 4
+
+    #: how many requests to make to a single host at once
+    external_link_host_concurrency = 2
+
+    #: how many requests per second to make to each host; None for no limit
+    external_link_rate = None  # type: Optional[float]
+
+    #: requests per second for particular hosts (like 'cdn.example.com'),
+    #: overriding external_link_rate
+    external_link_host_rates = {}  # type: Dict[str, Optional[float]]
+
+    #: how many times to retry links that respond with 429 or 503
+    external_link_retries = 3
+
+    #: seconds to wait before the first retry of a link whose response has no
+    #: Retry-After header; doubled for each retry after that
+    external_link_backoff = 1.0
+
+    #: the longest we'll wait before retrying a link, whatever Retry-After says
+    external_link_max_wait = 60.0
+
+    @instant_check('external_links', content_types=['text/html'])
+    def check_external_links(self, url, response):  # type: (str, TestHttpResponse) -> List[str]
+        """
+        Return every external URL linked to from response.
+        """
+
+        links = OrderedDict()  # type: OrderedDict[str, None]
+
+        for tag, attribute, link in extract_urls(response_text(response)):
+            if is_external(link):
+                links[absolute_external_url(link)] = None
+
+        return list(links)
+
     def test_external_links(self):  # type: () -> None
         """
         Ensure all external links are pointed at URLs that resolve and respond
         with or eventually redirect to somewhere that responds with a 200
         status code.
 
+        Links are looked for in every attribute that can hold a URL, srcset,
+        inline styles and <meta http-equiv="refresh">. Protocol-relative links
+        (//example.com/) are checked over https.
+
+        Links are checked external_link_workers at a time. To go easy on hosts
+        that appear on every page, set external_link_rate or
+        external_link_host_rates; links that respond with 429 or 503 are
+        retried after however long their Retry-After header asks for.
+
         If you want to change your user agent or exclude certain URLs or use a
         proxy or something, override attempt_to_get_external_url in your
         subclass.
         """
 
-        external_urls = defaultdict(list)
-
-        for internal_url, response in six.iteritems(self.instant_responses()):
-            if response['Content-Type'].split(';')[0] != 'text/html':
-                continue
-
-            soup = BeautifulSoup(response.content, "html5lib")
+        external_urls = defaultdict(list)  # type: Dict[str, List[str]]
 
-            for attribute in ['href', 'src', 'action']:
-                for prefix in ['http:', 'https:']:
-                    for element in soup.select(
-                        '[{0}^="{1}"]'.format(attribute, prefix)
-                    ):
-                        attr = element[attribute]
-                        if sys.version_info >= (3, 0):
-                            assert isinstance(attr, str)
-                        external_urls[attr].append(internal_url)
+        for internal_url, links in six.iteritems(self.instant_check_results('external_links')):
+            for url in links:
+                external_urls[url].append(internal_url)
 
         self.ensure_all_urls_resolve(external_urls)
 
+    def get_external_link_scheduler(self):  # type: () -> PoliteScheduler
+        return PoliteScheduler(
+            rate=self.external_link_rate,
+            host_rates=self.external_link_host_rates,
+            max_concurrency=self.external_link_workers,
+            host_concurrency=self.external_link_host_concurrency,
+            retries=self.external_link_retries,
+            backoff=self.external_link_backoff,
+            max_wait=self.external_link_max_wait,
+        )
+
     def ensure_all_urls_resolve(self, urls):  # type: (Dict[str, List[str]]) -> None
-        bad_responses = {}  # type: Dict[str, Union[int, Exception]]
+        # get this out of the way before we start, so that the first few
+        # requests aren't held up by it and then made all at once
+        import requests  # noqa: F401,F811
 
-        for url in urls:
+        scheduler = self.get_external_link_scheduler()
+
+        def check(url):  # type: (str) -> Tuple[str, Union[int, Exception, None]]
             try:
-                resp = self.attempt_to_get_external_url(url)
+                resp = scheduler.call(url, self.attempt_to_get_external_url)
             except Exception as e:
-                bad_responses[url] = e
-            else:
-                if resp.status_code != 200:
-                    bad_responses[url] = resp.status_code
+                return url, e
+            return url, (None if resp.status_code == 200 else resp.status_code)
+
+        if self.external_link_workers > 1 and len(urls) > 1:
+            from multiprocessing.pool import ThreadPool
+
+            pool = ThreadPool(min(self.external_link_workers, len(urls)))
+            try:
+                results = pool.map(check, list(urls))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [check(url) for url in urls]
+
+        bad_responses = dict(
+            (url, err) for url, err in results if err is not None
+        )  # type: Dict[str, Union[int, Exception]]
+
+        link_findings = [
+            (url, self.record_finding(
+                'external_links', internal_url, '{0}: {1}'.format(url, err),
+                baseline_key=url,
+            ))
+            for url, err in six.iteritems(bad_responses)
+            for internal_url in urls[url]
+        ]
+        new_findings = set(self.new_findings(
+            'external_links', [f for url, f in link_findings]))
+        new = set(url for url, f in link_findings if f in new_findings)
+        bad_responses = dict(
+            (url, err) for url, err in six.iteritems(bad_responses) if url in new)
 
         if bad_responses:
             raise self.failureException(
                 'The following links are broken:\n\n{0}'.format(
-                    '\n\n'.join(['{0}: {1}\nshown on {2}'.format(
-                        url, err, ', '.join(urls[url])
-                    ) for url, err in six.iteritems(bad_responses)])
+                    '\n\n'.join(self.summarise_report([
+                        '{0}: {1}\nshown on {2}'.format(
+                            url, err, ', '.join(urls[url])
+                        ) for url, err in six.iteritems(bad_responses)
+                    ]))
                 )
             )
 
     def attempt_to_get_external_url(self, url):  # type: (str) -> requests.Response
+        import requests  # noqa: F811
+
         with closing(
             requests.get(url, allow_redirects=True, stream=True)
         ) as r:
             return r
 
 
+class InternalLinks(InstantCoverageAPI):
+    instant_crawl_depth = 1
+
+    def test_internal_links(self):  # type: () -> None
+        """
+        Ensure the pages found by following links from covered URLs (see
+        instant_crawl_depth) load without errors and with status codes below
+        400.
+
+        Pages that load fine but match no URL pattern in covered_urls are
+        noted as findings, as suggestions for covered_urls.
+        """
+
+        discovered = self.instant_discovered_urls()
+        responses, errors = self.instant_responses(), self.instant_errors()
+        covered_patterns = set(get_url_pattern_key(url) for url in self.covered_urls)
+        broken = OrderedDict()  # type: OrderedDict[str, str]
+
+        for url in discovered:
+            if url in errors:
+                broken[url] = six.text_type(errors[url])
+            elif url in responses and responses[url].status_code >= 400:
+                broken[url] = six.text_type(responses[url].status_code)
+            elif url in responses and get_url_pattern_key(url) not in covered_patterns:
+                self.record_finding(
+                    'internal_link_suggestions', url,
+                    'linked to from {0}'.format(discovered[url][0]), severity='info',
+                )
+
+        new = set(f.detail for f in self.new_findings('internal_links', [
+            self.record_finding(
+                'internal_links', page, '{0}: {1}'.format(url, problem), baseline_key=url)
+            for url, problem in six.iteritems(broken)
+            for page in discovered[url]
+        ]))
+        broken = OrderedDict(
+            (url, problem) for url, problem in six.iteritems(broken)
+            if '{0}: {1}'.format(url, problem) in new
+        )
+
+        if broken:
+            raise self.failureException(
+                'The following internal links are broken:\n\n{0}'.format(
+                    '\n\n'.join(self.summarise_report([
+                        '{0}: {1}\nlinked to from {2}'.format(
+                            url, problem, ', '.join(discovered[url]))
+                        for url, problem in six.iteritems(broken)
+                    ]))
+                )
+            )
+
+
 class ValidHTML5(InstantCoverageAPI):
+    @instant_check('valid_html5', content_types=['text/html'])
+    def check_valid_html5(self, url, response):  # type: (str, TestHttpResponse) -> List[Tuple[str, str]]
+        """
+        Return (description, description without its position) for each
+        complaint html5lib has about response.
+        """
+
+        from html5lib import HTMLParser, constants
+
+        parser = HTMLParser()
+        parser.parse(response.content)
+
+        return [
+            ('Line: {line} Col: {col} {err}'.format(
+                line=l, col=c, err=constants.E[e] % v), constants.E[e] % v)
+            for ((l, c), e, v) in parser.errors
+        ]
+
     def test_valid_html5(self):  # type: () -> None
         """
         Ensure html5lib thinks our HTML is okay. Will catch really bad stuff
@@ -136,28 +427,24 @@ class ValidHTML5(InstantCoverageAPI):
         validator would complain about.
         """
 
-        parser_complaints = {}
+        parser_complaints = {}  # type: Dict[str, List[str]]
+        findings = [
+            # line numbers change when unrelated things do
+            self.record_finding('valid_html5', url, detail, baseline_key=key)
+            for url, complaints in six.iteritems(self.instant_check_results('valid_html5'))
+            for detail, key in complaints
+        ]  # type: List[Finding]
 
-        for url, response in six.iteritems(self.instant_responses()):
-            if response['Content-Type'].split(';')[0] != 'text/html':
-                continue
-
-            parser = HTMLParser()
-            parser.parse(response.content)
-
-            if parser.errors:
-                parser_complaints[url] = parser.errors
+        for finding in self.new_findings('valid_html5', findings):
+            parser_complaints.setdefault(finding.url, []).append(finding.detail)
 
         if parser_complaints:
             raise self.failureException(
                 'html5lib raised the following issues:\n\n{0}'.format(
-                    '\n\n'.join(['{url}:\n{errs}'.format(
-                        url=url, errs='\n'.join(
-                            ['Line: {line} Col: {col} {err}'.format(
-                                line=l, col=c, err=constants.E[e] % v)
-                             for ((l, c), e, v) in errors]
-                        )
-                    ) for url, errors in six.iteritems(parser_complaints)])
+                    '\n\n'.join(self.summarise_report([
+                        '{url}:\n{errs}'.format(url=url, errs='\n'.join(errors))
+                        for url, errors in six.iteritems(parser_complaints)
+                    ]))
                 )
             )
 
@@ -167,22 +454,28 @@ class WCAGZoo(InstantCoverageAPI):
     wcag_level = 'AA'
     wcag_css_static_dir = None
 
-    def test_wcag(self):  # type: () -> None
-        """
-        Test HTML for WCAG compliance using critters from WCAG Zoo. If you want
-        to only use some of the critters, provide a list of them by name in the
-        `wcag_critters` attribute; for instance `['molerat', 'tarsier']`. Have
-        a look at the WCAG Zoo documentation for information about what each of
-        these critters does. The default, `['parade']`, nests all other
-        critters.
+    def _get_wcag_static_dir(self):  # type: () -> str
+        if self.wcag_css_static_dir is not None:
+            return self.wcag_css_static_dir
 
-        You can also set the `wcag_level` attribute to 'A', 'AA', or 'AAA',
-        which affects things like how picky molerat will be about contrast
-        levels. Again, see the WCAG Zoo documentation for more detail.
+        try:
+            staticpath, = settings.STATICFILES_DIRS
+        except ValueError:
+            raise RuntimeError(
+                'Could not determine a single static directory to look '
+                'for your CSS in. Please ensure that your Django '
+                'STATICFILES_DIRS setting is a single directory, or set '
+                '{}.wcag_css_static_dir to the path you want us to look '
+                'in instead.'
+                .format(self.__class__.__name__)
+            )
 
-        If you're using Python 2 and have any non-ascii css, you'll probably
-        want to use my py2-supporting fork of wcag-zoo, which is available at
-        https://github.com/colons/wcag-zoo.
+        return staticpath
+
+    @instant_check('wcag', content_types=['text/html'])
+    def check_wcag(self, url, response):  # type: (str, TestHttpResponse) -> List[Any]
+        """
+        Return the failures each of wcag_critters found in response.
         """
 
         try:
@@ -195,58 +488,81 @@ class WCAGZoo(InstantCoverageAPI):
                 'with 2.7 support, like https://github.com/colons/wcag-zoo'
             )
 
-        results = {}  # type: Dict[str, List[Any]]
-        staticpath = self.wcag_css_static_dir
-        if staticpath is None:
-            try:
-                staticpath, = settings.STATICFILES_DIRS
-            except ValueError:
-                raise RuntimeError(
-                    'Could not determine a single static directory to look '
-                    'for your CSS in. Please ensure that your Django '
-                    'STATICFILES_DIRS setting is a single directory, or set '
-                    '{}.wcag_css_static_dir to the path you want us to look '
-                    'in instead.'
-                    .format(self.__class__.__name__)
+        from bs4 import BeautifulSoup
+
+        staticpath = self._get_wcag_static_dir()
+
+        soup = BeautifulSoup(response.content, 'html5lib')
+        for style in soup.select('link[rel="stylesheet"]'):
+            if sys.version_info >= (3, 0):
+                assert isinstance(style['href'], str)
+            if style['href'].startswith(settings.STATIC_URL):
+                style['href'] = style['href'].replace(
+                    settings.STATIC_URL, '', 1,
                 )
+        document = six.text_type(soup).encode('utf-8')
+
+        failures = []
 
         for critter_name in self.wcag_critters:
-            for url, response in six.iteritems(self.instant_responses()):
-                if response['Content-Type'].split(';')[0] != 'text/html':
-                    continue
-
-                soup = BeautifulSoup(response.content, 'html5lib')
-                for style in soup.select('link[rel="stylesheet"]'):
-                    if sys.version_info >= (3, 0):
-                        assert isinstance(style['href'], str)
-                    if style['href'].startswith(settings.STATIC_URL):
-                        style['href'] = style['href'].replace(
-                            settings.STATIC_URL, '', 1,
-                        )
-
-                critter = get_wcag_class(critter_name)(
-                    level=self.wcag_level, staticpath=staticpath,
-                )
+            critter = get_wcag_class(critter_name)(
+                level=self.wcag_level, staticpath=staticpath,
+            )
 
-                result = critter.validate_document(
-                    six.text_type(soup).encode('utf-8')
-                )
+            result = critter.validate_document(document)
+
+            if result['failures']:
+                failures.append(result['failures'])
+
+        return failures
+
+    def test_wcag(self):  # type: () -> None
+        """
+        Test HTML for WCAG compliance using critters from WCAG Zoo. If you want
+        to only use some of the critters, provide a list of them by name in the
+        `wcag_critters` attribute; for instance `['molerat', 'tarsier']`. Have
+        a look at the WCAG Zoo documentation for information about what each of
+        these critters does. The default, `['parade']`, nests all other
+        critters.
+
+        You can also set the `wcag_level` attribute to 'A', 'AA', or 'AAA',
+        which affects things like how picky molerat will be about contrast
+        levels. Again, see the WCAG Zoo documentation for more detail.
 
-                if result['failures']:
-                    error_list = results.setdefault(url, [])
-                    error_list.append(result['failures'])
+        If you're using Python 2 and have any non-ascii css, you'll probably
+        want to use my py2-supporting fork of wcag-zoo, which is available at
+        https://github.com/colons/wcag-zoo.
+        """
+
+        results = dict(
+            (url, failures)
+            for url, failures in six.iteritems(self.instant_check_results('wcag'))
+            if failures
+        )  # type: Dict[str, List[Any]]
+
+        new = set((f.url, f.detail) for f in self.new_findings('wcag', [
+            self.record_finding('wcag', url, pformat(failures))
+            for url, errors in six.iteritems(results)
+            for failures in errors
+        ]))
+        results = dict(
+            (url, [failures for failures in errors if (url, pformat(failures)) in new])
+            for url, errors in six.iteritems(results)
+        )
+        results = dict(
+            (url, errors) for url, errors in six.iteritems(results) if errors)
 
         if results:
             raise self.failureException(
                 u'Some critters in the WCAG Zoo found problems.\n\n{}'.format(
-                    u'\n\n'.join((
+                    u'\n\n'.join(self.summarise_report([
                         u'{}:\n{}'.format(
                             url,
                             u'\n'.join(
                                 pformat(e) for e in errors
                             ),
                         ) for url, errors in six.iteritems(results)
-                    ))
+                    ]))
                 )
             )
 
@@ -255,6 +571,70 @@ class Spelling(InstantCoverageAPI):
     spelling_language = None  # type: Optional[str]
     spelling_extra_words = set()  # type: Set[str]
 
+    #: how many processes to pull words out of pages in. None means one for
+    #: each CPU if there are more than spelling_process_threshold pages, and
+    #: none otherwise; 1 means never to start any
+    spelling_processes = None  # type: Optional[int]
+
+    #: how many pages there need to be before it's worth starting processes
+    #: to pull words out of them, if spelling_processes isn't set
+    spelling_process_threshold = 200
+
+    def get_spelling_pages(self):  # type: () -> List[Tuple[str, str]]
+        """
+        Return (url, html) for every page to check the spelling of.
+        """
+
+        return [
+            (url, response_text(response))
+            for url, response in six.iteritems(self.instant_responses())
+            if get_content_type(response) == 'text/html'
+        ]
+
+    def get_spelling_words(self):  # type: () -> Dict[str, List[str]]
+        """
+        Return the URLs of the pages each word in the prose of HTML responses
+        appears on, keyed by word. Inline scripts, styles and the like are
+        left out.
+
+        Pages are split between spelling_processes processes (if any), which
+        send back the numbers of the pages each word appears in rather than
+        their URLs.
+        """
+
+        urls, pages = [], []  # type: List[str], List[Tuple[int, str]]
+        for number, (url, html) in enumerate(self.get_spelling_pages()):
+            urls.append(url)
+            pages.append((number, html))
+
+        processes = self.spelling_processes
+        if processes is None and len(pages) > self.spelling_process_threshold:
+            from multiprocessing import cpu_count
+            processes = cpu_count()
+        processes = min(processes or 1, len(pages))
+
+        if processes > 1:
+            from multiprocessing import Pool
+
+            pool = Pool(processes)
+            try:
+                indexes = pool.map(index_words, [pages[i::processes] for i in range(processes)])
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            indexes = [index_words(pages)]
+
+        numbers = {}  # type: Dict[str, List[int]]
+        for index in indexes:
+            for word, page_numbers in six.iteritems(index):
+                numbers.setdefault(word, []).extend(page_numbers)
+
+        return dict(
+            (word, [urls[number] for number in sorted(page_numbers)])
+            for word, page_numbers in six.iteritems(numbers)
+        )
+
     def test_spelling(self):  # type: () -> None
         """
         Test spelling in the language specified in the `spelling_language`
@@ -262,10 +642,9 @@ class Spelling(InstantCoverageAPI):
         consider acceptable spellings in a `spelling_extra_words` attribute.
 
         This test is pretty stupid and I do not recommend adding it to your
-        full-time test suite. It will freak out about almost anything in any
-        inline <script>s you have and it doesn't care what a proper noun is. It
-        can't hurt to run it occasionally and make sure you've not done
-        something silly, though.
+        full-time test suite. It skips inline <script>s, <style>s and <code>,
+        but it doesn't care what a proper noun is. It can't hurt to run it
+        occasionally and make sure you've not done something silly, though.
 
         Only tests HTML content; we can't be confident about the intent of
         anything else.
@@ -282,8 +661,6 @@ class Spelling(InstantCoverageAPI):
                 'some additional packages in order for that install to run.'
             )
 
-        words = defaultdict(set)  # this is probably gonna get pretty big
-
         if self.spelling_language is None:
             raise AttributeError(
                 'Set {self}.spelling_language to the language you want to '
@@ -292,21 +669,17 @@ class Spelling(InstantCoverageAPI):
                 )
             )
 
-        for url, response in six.iteritems(self.instant_responses()):
-            if response['Content-Type'].split(';')[0] != 'text/html':
-                continue
-
-            text = BeautifulSoup(response.content, "html5lib").get_text()
-
-            for word in re.findall(r'\b[^_\d\W]+\b', text, flags=re.UNICODE):
-                words[word].add(url)
-
+        words = self.get_spelling_words()
         dictionary = enchant.Dict(self.spelling_language)
-        bad_words = {}
+        bad_words = {}  # type: Dict[str, List[str]]
 
-        for word, urls in six.iteritems(words):
-            if word not in self.spelling_extra_words and not dictionary.check(word):
-                bad_words[word] = urls
+        for finding in self.new_findings('spelling', [
+            self.record_finding('spelling', url, word, severity='warning')
+            for word, urls in six.iteritems(words)
+            if word not in self.spelling_extra_words and not dictionary.check(word)
+            for url in urls
+        ]):
+            bad_words.setdefault(finding.detail, []).append(finding.url)
 
         if bad_words:
             raise self.failureException(
@@ -314,7 +687,7 @@ class Spelling(InstantCoverageAPI):
                 "{problems}\n\n"
                 "If you disagree with any of these, add them to "
                 "{self}.spelling_extra_words.".format(
-                    problems='\n\n'.join([
+                    problems='\n\n'.join(self.summarise_report([
                         '"{word}"\n'
                         'seen on: {urls}\n'
                         'suggestions: {suggestions}'.format(
@@ -322,7 +695,344 @@ class Spelling(InstantCoverageAPI):
                             urls=', '.join(urls),
                             suggestions=', '.join(dictionary.suggest(word)),
                         ) for word, urls in six.iteritems(bad_words)
-                    ]),
+                    ])),
                     self=self.__class__.__name__,
                 )
             )
+
+
+class LoadTest(InstantCoverageAPI):
+    #: if set, write the load test's report to this file as JSON
+    load_test_report_path = None  # type: Optional[str]
+
+    #: if set, fail if more than this proportion of the requests for any URL
+    #: pattern fail
+    load_test_max_error_rate = None  # type: Optional[float]
+
+    def test_load(self):  # type: () -> None
+        """
+        Replay covered URLs as a load test (see instant_load_test), and record
+        the requests, errors and latency percentiles of each URL pattern as
+        'info' findings (see instant_findings_path). The full report is
+        written to load_test_report_path as JSON, if that's set.
+        """
+
+        from .load import LOAD_TEST_PERCENTILES
+
+        report = self.instant_load_test()
+
+        for load in report.patterns.values():
+            self.record_finding(
+                'load', None, '{0}: {1} requests, {2} errors, {3}'.format(
+                    load.pattern, load.requests, load.errors, ', '.join(
+                        'p{0} {1:.1f} ms'.format(p, (load.histogram.percentile(p) or 0) / 1000.0)
+                        for p in LOAD_TEST_PERCENTILES
+                    ),
+                ), severity='info',
+            )
+
+        if self.load_test_report_path is not None:
+            with io.open(self.load_test_report_path, 'w', encoding='utf-8') as report_file:
+                report_file.write(six.ensure_text(json.dumps(report.as_dict(), indent=2)))
+
+        if self.load_test_max_error_rate is None:
+            return
+
+        failing = [
+            load for load in report.patterns.values()
+            if load.error_rate > self.load_test_max_error_rate
+        ]
+
+        if failing:
+            raise self.failureException(
+                'The following URL patterns failed too often under load:\n\n{0}'.format(
+                    '\n'.join(self.summarise_report([
+                        '{0}: {1} of {2} requests'.format(load.pattern, load.errors, load.requests)
+                        for load in failing
+                    ]))
+                )
+            )
+
+
+class StaticAssets(InstantCoverageAPI):
+    #: if set, the largest size in bytes we'll accept for any static asset
+    static_asset_max_size = None  # type: Optional[int]
+
+    #: largest sizes in bytes for assets with particular extensions (like
+    #: '.js'), overriding static_asset_max_size
+    static_asset_max_sizes = {}  # type: Dict[str, int]
+
+    @instant_check('static_assets', content_types=['text/html'])
+    def check_static_assets(self, url, response):  # type: (str, TestHttpResponse) -> List[str]
+        """
+        Return the name of every static asset response refers to.
+        """
+
+        assets = OrderedDict()  # type: OrderedDict[str, None]
+
+        for tag, attribute, link in extract_urls(response_text(response)):
+            name = static_asset_name(url, link, getattr(settings, 'STATIC_URL', None))
+            if name is not None:
+                assets[name] = None
+
+        return list(assets)
+
+    def get_static_asset_max_size(self, name):  # type: (str) -> Optional[int]
+        return self.static_asset_max_sizes.get(
+            os.path.splitext(name)[1].lower(), self.static_asset_max_size)
+
+    def test_static_assets(self):  # type: () -> None
+        """
+        Ensure every static asset referred to by HTML responses (in
+        stylesheets, scripts, images and so on) exists, and is no bigger than
+        static_asset_max_size or its entry in static_asset_max_sizes.
+
+        Assets aren't requested. Instead, they're looked for in an index of
+        everything the staticfiles finders can find, and the hashed names in
+        the manifest of ManifestStaticFilesStorage if you use it.
+        """
+
+        if not getattr(settings, 'STATIC_URL', None):
+            raise AttributeError(
+                'Set STATIC_URL in your settings, so that static assets can be '
+                'told apart from everything else.'
+            )
+
+        pages = OrderedDict()  # type: OrderedDict[str, List[str]]
+
+        for url, names in six.iteritems(self.instant_check_results('static_assets')):
+            for name in names:
+                pages.setdefault(name, []).append(url)
+
+        index = get_static_asset_index()
+        problems = OrderedDict()  # type: OrderedDict[str, str]
+
+        for name in pages:
+            if name not in index:
+                problems[name] = 'not found'
+                continue
+
+            max_size = self.get_static_asset_max_size(name)
+            if max_size is None:
+                continue
+
+            storage, path = index[name]
+            size = storage.size(path)
+            if size > max_size:
+                problems[name] = '{0} bytes, which is more than {1}'.format(size, max_size)
+
+        new = set((f.url, f.detail) for f in self.new_findings('static_assets', [
+            self.record_finding(
+                'static_assets', url, '{0}: {1}'.format(name, problem), baseline_key=name)
+            for name, problem in six.iteritems(problems)
+            for url in pages[name]
+        ]))
+        problems = OrderedDict(
+            (name, problem) for name, problem in six.iteritems(problems)
+            if any((url, '{0}: {1}'.format(name, problem)) in new for url in pages[name])
+        )
+
+        if problems:
+            raise self.failureException(
+                'The following static assets are missing or too big:\n\n{0}'.format(
+                    '\n\n'.join(self.summarise_report([
+                        '{0}: {1}\nreferred to on {2}'.format(
+                            name, problem, ', '.join(pages[name]))
+                        for name, problem in six.iteritems(problems)
+                    ]))
+                )
+            )
+
+
+class Snapshots(InstantCoverageAPI):
+    #: where to keep snapshots of what each URL rendered
+    snapshot_path = None  # type: Optional[str]
+
+    #: set to True to update the snapshots at snapshot_path with what each URL
+    #: renders now, rather than comparing against them
+    update_snapshots = False
+
+    #: (regex, replacement) pairs applied to content before it's compared,
+    #: for things like CSRF tokens and timestamps that change every time a
+    #: page is rendered
+    snapshot_normalisers = SNAPSHOT_NORMALISERS  # type: Sequence[Tuple[str, str]]
+
+    #: how many lines of context to show around changes
+    snapshot_diff_context = 3
+
+    @instant_check('snapshot')
+    def check_snapshot(self, url, response):  # type: (str, TestHttpResponse) -> str
+        """
+        Return the hash of the normalised status code and content of response
+        or, if we're updating snapshots, the normalised text itself, so that
+        it needn't be worked out again.
+        """
+
+        text = snapshot_text(response, self.snapshot_normalisers)
+        return text if self.update_snapshots else snapshot_hash(text)
+
+    def test_snapshots(self):  # type: () -> None
+        """
+        Ensure every URL renders what it did when its snapshot was taken.
+
+        Only hashes are compared, so this is quick, and a diff is only worked
+        out for URLs whose hashes don't match. Set update_snapshots to take
+        new snapshots.
+        """
+
+        if self.snapshot_path is None:
+            raise AttributeError(
+                'Set {self}.snapshot_path to the file you want to keep '
+                'snapshots in.'.format(self=self.__class__.__name__)
+            )
+
+        snapshot = SnapshotFile(self.snapshot_path)
+
+        if self.update_snapshots:
+            snapshot.update(self.instant_check_results('snapshot'))
+            return
+
+        hashes = self.instant_check_results('snapshot')
+        responses = self.instant_responses()
+
+        changes = []  # type: List[str]
+
+        for url, content_hash in six.iteritems(hashes):
+            if snapshot.hashes.get(url) == content_hash:
+                continue
+
+            old = snapshot.text(url)
+            if old is None:
+                changes.append('{0}: no snapshot'.format(url))
+                continue
+
+            new = snapshot_text(responses[url], self.snapshot_normalisers)
+            changes.append('\n'.join(difflib.unified_diff(
+                old.splitlines(), new.splitlines(),
+                'snapshot of {0}'.format(url), url,
+                n=self.snapshot_diff_context, lineterm='',
+            )))
+
+        if changes:
+            raise self.failureException(
+                'The following URLs have changed since they were snapshotted in '
+                '{path}:\n\n{changes}\n\n'
+                'If these changes are intended, set {self}.update_snapshots '
+                'and run this test again.'.format(
+                    path=self.snapshot_path,
+                    changes='\n\n'.join(self.summarise_report(changes)),
+                    self=self.__class__.__name__,
+                )
+            )
+
+
+class QueryCounts(InstantCoverageAPI):
+    #: fail URLs that make the same query (ignoring its parameters) more than
+    #: this many times, which usually means a query is being made in a loop
+    query_repeat_threshold = 10  # type: Optional[int]
+
+    #: if set, fail URLs that make more than this many queries in total
+    query_budget = None  # type: Optional[int]
+
+    #: the aliases of the databases to count queries on; None means every
+    #: database this test is allowed to use. Databases the test isn't allowed
+    #: to use are left out either way
+    query_databases = None  # type: Optional[Sequence[str]]
+
+    def attempt_to_get_internal_url(self, url):  # type: (str) -> TestHttpResponse
+        aliases = allowed_databases(self, self.query_databases)
+        if not aliases:
+            return super(QueryCounts, self).attempt_to_get_internal_url(url)
+
+        with QueryCapture(aliases) as capture:
+            response = super(QueryCounts, self).attempt_to_get_internal_url(url)
+
+        response.instant_queries = dict(capture.fingerprints())  # type: ignore
+        return response
+
+    @instant_check('queries')
+    def check_queries(self, url, response):  # type: (str, TestHttpResponse) -> Optional[Dict[str, int]]
+        """
+        Return how many times each query was made while loading response,
+        keyed by fingerprint, or None if they weren't counted.
+        """
+
+        return getattr(response, 'instant_queries', None)
+
+    def get_query_problems(self, queries):  # type: (Dict[str, int]) -> List[Tuple[str, str]]
+        """
+        Return (description, baseline key) for everything wrong with the
+        queries made for a single URL.
+        """
+
+        problems = []  # type: List[Tuple[str, str]]
+        total = sum(queries.values())
+
+        if self.query_budget is not None and total > self.query_budget:
+            problems.append((
+                '{0} queries, more than the budget of {1}'.format(total, self.query_budget),
+                'over budget',
+            ))
+
+        if self.query_repeat_threshold is not None:
+            for fingerprint, count in sorted(six.iteritems(queries), key=lambda q: -q[1]):
+                if count > self.query_repeat_threshold:
+                    problems.append(('{0} times: {1}'.format(count, fingerprint), fingerprint))
+
+        return problems
+
+    def test_queries(self):  # type: () -> None
+        """
+        Ensure no URL makes the same database query over and over (an N+1
+        query, most likely) or more than query_budget queries in total.
+        URLs are reported together by URL pattern, with whichever was worst,
+        so that pages of the same list don't each get a report of their own.
+
+        Queries are only counted when loading with the test client, in the
+        test process or forked from it, on databases the test is allowed to
+        use.
+        """
+
+        results = dict(
+            (url, queries)
+            for url, queries in six.iteritems(self.instant_check_results('queries'))
+            if queries is not None
+        )
+
+        if not results:
+            raise self.failureException(
+                "No queries were counted. Ensure {0}.databases (or "
+                "query_databases) includes the databases your views use, and "
+                "that URLs are loaded with the test client.".format(self.__class__.__name__)
+            )
+        totals = dict((url, sum(queries.values())) for url, queries in six.iteritems(results))
+
+        findings = [
+            self.record_finding('queries', url, detail, baseline_key=key)
+            for url, queries in six.iteritems(results)
+            for detail, key in self.get_query_problems(queries)
+        ]  # type: List[Finding]
+
+        patterns = OrderedDict()  # type: OrderedDict[str, OrderedDict[str, List[str]]]
+
+        for finding in self.new_findings('queries', findings):
+            patterns.setdefault(
+                get_url_pattern_key(finding.url), OrderedDict(),
+            ).setdefault(finding.url, []).append(finding.detail)
+
+        if patterns:
+            reports = []
+            for pattern, urls in six.iteritems(patterns):
+                worst = max(urls, key=lambda url: totals[url])
+                reports.append(
+                    '{pattern}: {count} URL{s}, worst of which is {url} with '
+                    '{total} queries:\n{problems}'.format(
+                        pattern=pattern, count=len(urls), s='' if len(urls) == 1 else 's',
+                        url=worst, total=totals[worst], problems='\n'.join(urls[worst]),
+                    )
+                )
+
+            raise self.failureException(
+                'The following URL patterns make too many database '
+                'queries:\n\n{0}'.format('\n\n'.join(self.summarise_report(reports)))
+            )
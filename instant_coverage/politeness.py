@@ -0,0 +1,148 @@
+"""
+Keeping our requests to other people's websites polite: a limit on how many
+we make at once, a limit on how often we bother each host, and backing off
+when a host tells us we're going too fast.
+"""
+
+import sys
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+from timeit import default_timer
+
+from six.moves.urllib.parse import urlsplit
+
+if sys.version_info >= (3, 6):
+    from typing import Any, Callable, Dict, Optional, Tuple  # noqa: F401
+
+
+#: status codes that mean "try again later"
+RETRY_STATUS_CODES = frozenset([429, 503])
+
+
+class TokenBucket(object):
+    """
+    Allow rate calls to acquire() per second on average, and up to burst of
+    them in quick succession. Safe to share between threads; callers that
+    have to wait are given slots in the order they asked for them.
+    """
+
+    def __init__(
+        self, rate, burst=1, clock=default_timer, sleep=time.sleep,
+    ):  # type: (float, int, Callable[[], float], Callable[[float], Any]) -> None
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):  # type: () -> float
+        """
+        Take a token, and return how many seconds we have to wait before
+        using it.
+        """
+
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):  # type: () -> None
+        wait = self.reserve()
+        if wait > 0:
+            self.sleep(wait)
+
+
+def retry_after(response, now=None):  # type: (Any, Optional[float]) -> Optional[float]
+    """
+    Return how many seconds the Retry-After header of response asks us to
+    wait, or None if it doesn't have one we understand.
+    """
+
+    value = (response.headers.get('Retry-After') or '').strip()
+    if not value:
+        return None
+
+    if value.isdigit():
+        return float(value)
+
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+
+    return max(0.0, mktime_tz(parsed) - (time.time() if now is None else now))
+
+
+class PoliteScheduler(object):
+    """
+    Make requests on behalf of any number of threads, never more than
+    max_concurrency at once or host_concurrency to a single host, at no more
+    than rate requests per second to each host (or the rate given for it in
+    host_rates; a rate of None means no limit), retrying responses with
+    RETRY_STATUS_CODES up to retries times.
+
+    We wait for as long as Retry-After asks us to, or backoff seconds doubled
+    for each attempt so far if it doesn't say, but never more than max_wait.
+    """
+
+    def __init__(
+        self, rate=None, host_rates=None, burst=1, max_concurrency=4,
+        host_concurrency=2, retries=3, backoff=1.0, max_wait=60.0,
+        sleep=time.sleep,
+    ):  # type: (Optional[float], Optional[Dict[str, Optional[float]]], int, int, int, int, float, float, Callable[[float], Any]) -> None  # noqa: E501
+        self.rate = rate
+        self.host_rates = host_rates or {}
+        self.burst = burst
+        self.host_concurrency = host_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.sleep = sleep
+
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.hosts = {}  # type: Dict[str, Tuple[Optional[TokenBucket], threading.BoundedSemaphore]]
+        self.lock = threading.Lock()
+
+    def _host(self, host):  # type: (str) -> Tuple[Optional[TokenBucket], threading.BoundedSemaphore]
+        with self.lock:
+            if host not in self.hosts:
+                rate = self.host_rates.get(host, self.rate)
+                self.hosts[host] = (
+                    TokenBucket(rate, self.burst, sleep=self.sleep) if rate else None,
+                    threading.BoundedSemaphore(self.host_concurrency),
+                )
+            return self.hosts[host]
+
+    def call(self, url, fetch):  # type: (str, Callable[[str], Any]) -> Any
+        """
+        Return fetch(url), once we're allowed to call it and once the host
+        at url has stopped asking us to try again later.
+        """
+
+        bucket, host_semaphore = self._host(urlsplit(url).netloc.lower())
+        attempt = 0
+
+        while True:
+            with host_semaphore:
+                if bucket is not None:
+                    bucket.acquire()
+                with self.semaphore:
+                    response = fetch(url)
+
+            if (
+                getattr(response, 'status_code', None) not in RETRY_STATUS_CODES or
+                attempt >= self.retries
+            ):
+                return response
+
+            wait = retry_after(response)
+            if wait is None:
+                wait = self.backoff * (2 ** attempt)
+
+            self.sleep(min(wait, self.max_wait))
+            attempt += 1
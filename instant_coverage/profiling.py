@@ -0,0 +1,244 @@
+"""
+Accounting for where the time and memory of a run goes: how long loading
+URLs, each check, each test and each template took, and how much memory they
+needed.
+"""
+
+import atexit
+import io
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from timeit import default_timer
+
+import six
+
+from .findings import get_process_path
+
+if sys.version_info >= (3, 6):
+    from typing import Any, Dict, List, Optional, Set, Tuple  # noqa: F401
+
+
+if hasattr(time, 'process_time'):
+    cpu_timer = time.process_time
+else:
+    cpu_timer = time.clock  # type: ignore
+
+
+def get_tracemalloc():  # type: () -> Any
+    """
+    Return the tracemalloc module, or None on python 2. It's only imported
+    once we're asked to trace memory, to keep it out of everyone else's runs.
+    """
+
+    try:
+        import tracemalloc
+    except ImportError:  # python 2
+        return None
+
+    return tracemalloc
+
+
+class Profile(object):
+    """
+    The total cost of everything recorded under one (kind, name): wall and
+    CPU seconds, how many items (URLs or responses) were dealt with, and the
+    most memory allocated at once, in bytes, if we were tracing allocations.
+    """
+
+    def __init__(self, kind, name):  # type: (str, str) -> None
+        self.kind = kind
+        self.name = name
+        self.calls = 0
+        self.items = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = None  # type: Optional[int]
+
+    def as_dict(self):  # type: () -> Dict[str, Any]
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'calls': self.calls,
+            'items': self.items,
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'peak_memory': self.peak_memory,
+        }
+
+
+class _Frame(object):
+    def __init__(self, profile, items, memory):  # type: (Profile, int, bool) -> None
+        self.profile = profile
+        self.items = items
+        self.memory = memory
+        self.memory_start = 0
+        self.memory_peak = 0
+        self.wall_start = 0.0
+        self.cpu_start = 0.0
+
+
+class Profiler(object):
+    """
+    Profiles keyed by (kind, name), and the frames currently being timed.
+
+    tracemalloc only keeps one peak, so when a frame starts inside another
+    we note the peak so far against the outer frame before resetting it.
+
+    Frames can be timed from several threads at once (templates rendered by
+    a live server or a load test, say), so each thread has a stack of its
+    own, and profiles are only changed with lock held.
+    """
+
+    def __init__(self):  # type: () -> None
+        self.profiles = OrderedDict()  # type: OrderedDict[Tuple[str, str], Profile]
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.report_paths = set()  # type: Set[str]
+        self.summarise = False
+
+    @property
+    def stack(self):  # type: () -> List[_Frame]
+        return self.local.__dict__.setdefault('stack', [])
+
+    def get(self, kind, name):  # type: (str, str) -> Profile
+        key = (kind, name)
+        with self.lock:
+            if key not in self.profiles:
+                self.profiles[key] = Profile(kind, name)
+            return self.profiles[key]
+
+    def start(self, kind, name, items=0, memory=False):  # type: (str, str, int, bool) -> _Frame
+        tracemalloc = get_tracemalloc() if memory else None
+        frame = _Frame(self.get(kind, name), items, tracemalloc is not None)
+
+        if tracemalloc is not None:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                parent = self.stack[-1]
+                parent.memory_peak = max(parent.memory_peak, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            frame.memory_start = frame.memory_peak = current
+
+        self.stack.append(frame)
+        frame.cpu_start = cpu_timer()
+        frame.wall_start = default_timer()
+        return frame
+
+    def stop(self, frame):  # type: (_Frame) -> None
+        wall = default_timer() - frame.wall_start
+        cpu = cpu_timer() - frame.cpu_start
+
+        if frame in self.stack:
+            self.stack.remove(frame)
+
+        tracemalloc = get_tracemalloc() if frame.memory else None
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            peak = max(frame.memory_peak, tracemalloc.get_traced_memory()[1])
+        else:
+            peak = None
+
+        profile = frame.profile
+        with self.lock:
+            profile.calls += 1
+            profile.items += frame.items
+            profile.wall += wall
+            profile.cpu += cpu
+            if peak is not None:
+                profile.peak_memory = max(profile.peak_memory or 0, peak - frame.memory_start)
+
+    def as_dicts(self):  # type: () -> List[Dict[str, Any]]
+        with self.lock:
+            return [p.as_dict() for p in self.profiles.values()]
+
+    def format(self):  # type: () -> str
+        def mib(value):  # type: (Optional[int]) -> str
+            return '-' if value is None else '{0:.1f}'.format(value / 1048576.0)
+
+        lines = ['{0:<6} {1:>6} {2:>7} {3:>9} {4:>9} {5:>9}  {6}'.format(
+            'kind', 'calls', 'items', 'wall s', 'cpu s', 'peak MiB', 'name')]
+
+        for profile in sorted(self.profiles.values(), key=lambda p: -p.wall):
+            lines.append('{0:<6} {1:>6} {2:>7} {3:>9.3f} {4:>9.3f} {5:>9}  {6}'.format(
+                profile.kind, profile.calls, profile.items, profile.wall,
+                profile.cpu, mib(profile.peak_memory), profile.name,
+            ))
+
+        return '\n'.join(lines)
+
+    def write(self, path):  # type: (str) -> None
+        with io.open(path, 'w', encoding='utf-8') as report_file:
+            report_file.write(six.ensure_text(json.dumps(self.as_dicts(), indent=2)))
+
+    def report(self):  # type: () -> None
+        if not self.profiles:
+            return
+
+        # every worker of a parallel run writes a report of its own
+        for path in self.report_paths:
+            self.write(get_process_path(path))
+
+        if self.summarise:
+            sys.stderr.write('\ninstant-coverage profile:\n{0}\n'.format(self.format()))
+
+
+#: the profiler used by every test in this process
+profiler = Profiler()
+
+
+def template_name(template):  # type: (Any) -> str
+    origin = getattr(template, 'origin', None)
+    return (
+        getattr(origin, 'template_name', None) or getattr(template, 'name', None) or
+        '<unknown source>'
+    )
+
+
+class TemplateProfiling(object):
+    """
+    While enabled, time every render of a Django template, as a 'template'
+    if it's rendered by a view and an 'include' if it's rendered inside
+    another template (by {% include %} or an inclusion tag). Templates that
+    are extended are part of the template that extends them.
+
+    Times include the time spent rendering includes, so that the templates
+    that pull in the most expensive ones show up too.
+    """
+
+    def __init__(self, profiler=profiler):  # type: (Profiler) -> None
+        self.profiler = profiler
+        self.local = threading.local()
+        self.original = None  # type: Any
+
+    def enable(self):  # type: () -> None
+        from django.template.base import Template
+
+        self.original = original = Template.render
+        local, profiler = self.local, self.profiler
+
+        def render(template, context):  # type: (Any, Any) -> Any
+            depth = getattr(local, 'depth', 0)
+            frame = profiler.start('include' if depth else 'template', template_name(template))
+            local.depth = depth + 1
+            try:
+                return original(template, context)
+            finally:
+                local.depth = depth
+                profiler.stop(frame)
+
+        Template.render = render  # type: ignore
+
+    def disable(self):  # type: () -> None
+        from django.template.base import Template
+
+        Template.render = self.original  # type: ignore
+
+
+@atexit.register
+def _report_profiles():  # type: () -> None
+    profiler.report()
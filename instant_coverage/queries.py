@@ -0,0 +1,99 @@
+"""
+Capturing the database queries views make, and telling queries that only
+differ in their parameters apart from ones that are actually different.
+"""
+
+import re
+import sys
+from collections import Counter
+
+if sys.version_info >= (3, 6):
+    from typing import Any, Iterable, List, Optional  # noqa: F401
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_PLACEHOLDER = re.compile(r'%s|\?|:\w+|\$\d+')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql):  # type: (str) -> str
+    """
+    Return sql with its literals and parameters replaced with ?, and lists of
+    them collapsed, so that the same query made for different objects has the
+    same fingerprint.
+    """
+
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def allowed_databases(test, aliases=None):  # type: (Any, Optional[Iterable[str]]) -> List[str]
+    """
+    Return the aliases (of those in aliases, or of all of them) of the
+    databases that test is allowed to query: its databases on django 2.2 and
+    newer, and whatever multi_db and allow_database_queries let it use before
+    that.
+    """
+
+    from django.db import DEFAULT_DB_ALIAS, connections
+
+    databases = getattr(test, 'databases', None)
+    if databases is None:
+        databases = (
+            '__all__' if getattr(test, 'multi_db', False)
+            else [DEFAULT_DB_ALIAS] if getattr(test, 'allow_database_queries', True)
+            else []
+        )
+
+    return [
+        alias for alias in (connections if aliases is None else aliases)
+        if databases == '__all__' or alias in databases
+    ]
+
+
+class QueryCapture(object):
+    """
+    Capture the queries made on the database connections called aliases (or
+    all of them) while in use as a context manager.
+    """
+
+    def __init__(self, aliases=None):  # type: (Optional[Iterable[str]]) -> None
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+
+        self.contexts = [
+            CaptureQueriesContext(connections[alias])
+            for alias in (connections if aliases is None else aliases)
+        ]
+
+    def __enter__(self):  # type: () -> QueryCapture
+        entered = []  # type: List[Any]
+        try:
+            for context in self.contexts:
+                context.__enter__()
+                entered.append(context)
+        except Exception:
+            for context in reversed(entered):
+                context.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc_info):  # type: (*Any) -> None
+        for context in reversed(self.contexts):
+            context.__exit__(*exc_info)
+
+    def fingerprints(self):  # type: () -> Counter
+        """
+        Return how many times each query was made, keyed by fingerprint.
+        """
+
+        return Counter(
+            fingerprint_sql(query['sql'])
+            for context in self.contexts
+            for query in context.captured_queries
+        )
@@ -0,0 +1,125 @@
+"""
+Snapshots of what each URL rendered, kept in a single zip file: an index of
+the hash of each URL's content, and the content itself under its hash, so
+that comparing a run against a snapshot only needs the index, and identical
+pages are only stored once.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import zipfile
+
+import six
+
+from . import get_content_type
+from .links import response_text
+
+if sys.version_info >= (3, 6):
+    from typing import Dict, Optional, Sequence, Tuple  # noqa: F401
+    from .type_utils import TestHttpResponse  # noqa: F401
+
+
+#: the name of the index within a snapshot file
+SNAPSHOT_INDEX = 'index.json'
+
+#: content types, besides text/*, +json and +xml ones, whose content is text
+#: that can be normalised and diffed; anything else is snapshotted by its hash
+SNAPSHOT_TEXT_TYPES = frozenset([
+    'application/javascript', 'application/json', 'application/xml',
+])
+
+#: (regex, replacement) pairs for things that change every time a page is
+#: rendered without the page itself changing
+SNAPSHOT_NORMALISERS = [
+    (r'''(name=["']csrfmiddlewaretoken["'][^>]*?value=["'])[^"']*''', r'\1[csrf token]'),
+    (r'''(value=["'])[^"']*(["'][^>]*?name=["']csrfmiddlewaretoken["'])''', r'\1[csrf token]\2'),
+    (r'''(nonce=["'])[^"']*''', r'\1[nonce]'),
+    # patterns that can only start with a few characters are much quicker to
+    # look for than ones that start with \b or \d
+    (r'[12]\d{3}-[01]\d-[0-3]\d[T ]\d\d:\d\d(?::\d\d(?:\.\d+)?)?(?:Z|[+-]\d\d:?\d\d)?', '[timestamp]'),
+]  # type: Sequence[Tuple[str, str]]
+
+
+def is_text(content_type):  # type: (str) -> bool
+    return (
+        content_type.startswith('text/') or content_type in SNAPSHOT_TEXT_TYPES or
+        content_type.endswith(('+json', '+xml'))
+    )
+
+
+def snapshot_text(response, normalisers):  # type: (TestHttpResponse, Sequence[Tuple[str, str]]) -> str
+    """
+    Return the status code and content of response, with normalisers applied.
+    Content that isn't text is described by its size and the hash of its raw
+    bytes instead, since decoding it could make different content look the
+    same.
+    """
+
+    content_type = get_content_type(response)
+    if not is_text(content_type):
+        return u'{0}\n[{1} bytes of {2}, sha1 {3}]'.format(
+            response.status_code, len(response.content), content_type or 'unknown type',
+            hashlib.sha1(response.content).hexdigest(),
+        )
+
+    text = response_text(response)
+    for pattern, replacement in normalisers:
+        text = re.sub(pattern, replacement, text)
+
+    return u'{0}\n{1}'.format(response.status_code, text)
+
+
+def snapshot_hash(text):  # type: (str) -> str
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SnapshotFile(object):
+    """
+    The snapshot stored at path, which might not exist yet.
+    """
+
+    def __init__(self, path):  # type: (str) -> None
+        self.path = path
+        self.hashes = {}  # type: Dict[str, str]
+
+        if os.path.exists(path):
+            with zipfile.ZipFile(path) as snapshot:
+                self.hashes = json.loads(snapshot.read(SNAPSHOT_INDEX).decode('utf-8'))
+
+    def text(self, url):  # type: (str) -> Optional[str]
+        if url not in self.hashes:
+            return None
+
+        with zipfile.ZipFile(self.path) as snapshot:
+            return snapshot.read(self.hashes[url]).decode('utf-8')
+
+    def update(self, texts):  # type: (Dict[str, str]) -> None
+        """
+        Replace the snapshots of the URLs in texts, keeping the rest.
+        """
+
+        hashes = dict(self.hashes)
+        contents = {}  # type: Dict[str, bytes]
+
+        for url, text in six.iteritems(texts):
+            hashes[url] = snapshot_hash(text)
+            contents[hashes[url]] = text.encode('utf-8')
+
+        temporary_path = self.path + '.tmp'
+
+        with zipfile.ZipFile(temporary_path, 'w', zipfile.ZIP_DEFLATED) as snapshot:
+            snapshot.writestr(SNAPSHOT_INDEX, json.dumps(hashes, sort_keys=True))
+
+            if os.path.exists(self.path):
+                with zipfile.ZipFile(self.path) as old:
+                    for name in set(hashes.values()) - set(contents):
+                        snapshot.writestr(name, old.read(name))
+
+            for name, content in six.iteritems(contents):
+                snapshot.writestr(name, content)
+
+        getattr(os, 'replace', os.rename)(temporary_path, self.path)
+        self.hashes = hashes
@@ -0,0 +1,58 @@
+from typing import Any, cast
+
+import django
+from django.http import HttpResponse
+from django.test import SimpleTestCase
+
+from .utils import WorkingView, mocked_patterns
+from .. import InstantCoverageMixin, _instant_cache
+from ..cache import ResponseCache
+
+if django.VERSION > (3, 0):
+    from django.urls import re_path
+else:
+    from django.conf.urls import url as re_path  # type: ignore
+
+
+def make_cache(size):  # type: (int) -> Any
+    return {'responses': {'/': HttpResponse(b' ' * size)}, 'redirect_targets': {}}
+
+
+class ResponseCacheTest(SimpleTestCase):
+    def test_least_recently_used_evicted(self):  # type: () -> None
+        cache = ResponseCache()
+        first, second, third = make_cache(1000), make_cache(1000), make_cache(1000)
+
+        cache.set(int, None, first, max_bytes=2500)
+        cache.set(str, None, second, max_bytes=2500)
+        self.assertIs(cache.get(int, None), first)
+
+        cache.set(bytes, None, third, max_bytes=2500)
+        self.assertIsNone(cache.get(str, None))
+        self.assertIs(cache.get(int, None), first)
+
+        # a class's own personas are never evicted to make room for each other
+        cache.set(bytes, 'other', make_cache(5000), max_bytes=2500)
+        self.assertEqual(
+            sorted(key[1] or '' for key in cache.entries), ['', 'other'])
+        self.assertIs(cache.get(bytes, None), third)
+
+    def test_released(self):  # type: () -> None
+        with mocked_patterns([
+            re_path(r'^$', WorkingView.as_view()),
+        ]):
+            class ReleasedTest(InstantCoverageMixin, SimpleTestCase):
+                covered_urls = ['/']
+
+            cast(Any, ReleasedTest).setUpClass()
+            test = ReleasedTest('test_no_errors')
+            test.setUp()
+            test.instant_responses()
+            test.doCleanups()
+            self.assertEqual(len(_instant_cache.for_class(ReleasedTest)), 1)
+
+            cast(Any, ReleasedTest).tearDownClass()
+            # undo whatever django's setUpClass set up, on pythons that have
+            # class cleanups
+            getattr(ReleasedTest, 'doClassCleanups', lambda: None)()
+            self.assertEqual(_instant_cache.for_class(ReleasedTest), [])
@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+
+from ..links import extract_urls, is_external
+
+
+class ExtractURLsTest(SimpleTestCase):
+    def test_everything_found(self):  # type: () -> None
+        self.assertEqual(extract_urls(
+            '<!doctype html><html><head>'
+            '<meta http-equiv="Refresh" content="5; url=\'https://refresh.example/\'">'
+            '<link rel="stylesheet" href="/static/style.css">'
+            '<style>body { background: url("https://style-element.example/bg.png"); }</style>'
+            '</head><body>'
+            '<a href=" https://a.example/?a=1&amp;b=2 ">a</a>'
+            '<img src="//cdn.example/img.png" srcset="/small.png 1x, https://big.example/img.png 2x">'
+            '<div style="background-image: url(https://inline.example/img.png)"></div>'
+            '<form action="http://form.example/"><button formaction="/other/"></button></form>'
+            '<a name="no-href">nothing</a>'
+            '</body></html>'
+        ), [
+            ('meta', 'content', 'https://refresh.example/'),
+            ('link', 'href', '/static/style.css'),
+            ('style', 'style', 'https://style-element.example/bg.png'),
+            ('a', 'href', 'https://a.example/?a=1&b=2'),
+            ('img', 'src', '//cdn.example/img.png'),
+            ('img', 'srcset', '/small.png'),
+            ('img', 'srcset', 'https://big.example/img.png'),
+            ('div', 'style', 'https://inline.example/img.png'),
+            ('form', 'action', 'http://form.example/'),
+            ('button', 'formaction', '/other/'),
+        ])
+
+    def test_is_external(self):  # type: () -> None
+        self.assertEqual(
+            [is_external(url) for url in ['http://a', 'https://a', '//a', '/a', 'a', 'mailto:a']],
+            [True, True, True, False, False, False],
+        )
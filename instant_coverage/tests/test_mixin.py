@@ -1,4 +1,11 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
 from typing import Any, cast
+from unittest import skipIf
 
 import django
 from django.conf.urls import include
@@ -8,13 +15,18 @@ from django.test import TestCase
 from django.test.utils import override_settings
 
 from .utils import BrokenView, PickyTestResult, WorkingView, get_results_for, mocked_patterns
-from .. import IGNORE_TUTORIAL, INSTANT_TRACEBACKS_TUTORIAL, InstantCoverageMixin
+from .. import IGNORE_TUTORIAL, INSTANT_TRACEBACKS_TUTORIAL, InstantCoverageMixin, instant_check
+from ..errors import ErrorCollector
 
 if django.VERSION > (3, 0):
     from django.urls import re_path
 else:
     from django.conf.urls import url as re_path  # type: ignore
 
+if sys.version_info >= (3, 6):
+    from typing import List, Tuple  # noqa: F401
+    from django.test.client import Client  # noqa: F401
+
 
 class FailuresTest(TestCase):
     def test_no_errors_okay(self):  # type: () -> None
@@ -51,6 +63,29 @@ class FailuresTest(TestCase):
                 IGNORE_TUTORIAL.format(name='EverythingTest')
             )
 
+    def test_crawled_urls_suggested(self):  # type: () -> None
+        def index(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse('<a href="/untested-url/?page=2">more</a>', content_type='text/html')
+
+        with mocked_patterns([
+            re_path(r'^tested-url/$', index),
+            re_path(r'^untested-url/$', WorkingView.as_view()),
+            re_path(r'^unlinked-url/$', WorkingView.as_view()),
+        ]):
+            results = get_results_for(
+                'test_all_urls_accounted_for', covered_urls=['/tested-url/'],
+                instant_crawl_depth=1,
+            )
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following views are untested:\n\n"
+                "() ^untested-url/$ (None), such as /untested-url/?page=2, "
+                "which was linked to from /tested-url/\n"
+                "() ^unlinked-url/$ (None)\n\n" +
+                IGNORE_TUTORIAL.format(name='EverythingTest')
+            )
+
     def test_messaging_for_non_regex_patterns(self):  # type: () -> None
         if django.VERSION < (2, 0):
             self.skipTest('only works on django 2.0 or newer')
@@ -332,3 +367,543 @@ class FailuresTest(TestCase):
             get_results_for('test_no_errors', covered_urls=['/redir/'],
                             follow_redirects=False)
             self.assertEqual(calls, ['redir'])
+
+    def test_fork_workers(self):  # type: () -> None
+        if not hasattr(os, 'fork'):
+            self.skipTest('requires os.fork')
+
+        def missing_view(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            raise Http404
+
+        with mocked_patterns([
+            re_path(r'^working/\d+/$', WorkingView.as_view()),
+            re_path(r'^broken/$', BrokenView.as_view()),
+            re_path(r'^404/$', missing_view),
+        ]):
+            covered_urls = ['/working/{}/'.format(n) for n in range(5)] + ['/broken/', '/404/']
+
+            results = get_results_for('test_no_errors', covered_urls=covered_urls, instant_fork_workers=3)
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following errors were raised:\n\n"
+                "/broken/: this view is broken\n\n" +
+                INSTANT_TRACEBACKS_TUTORIAL.format(name='EverythingTest')
+            )
+
+            results = get_results_for(
+                'test_acceptable_status_codes', covered_urls=covered_urls, instant_fork_workers=3)
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following bad status codes were seen:\n\n"
+                "/404/: 404"
+            )
+
+    def test_fork_workers_report_redirects_and_patterns(self):  # type: () -> None
+        if not hasattr(os, 'fork'):
+            self.skipTest('requires os.fork')
+
+        with mocked_patterns([
+            re_path(r'^working/$', WorkingView.as_view()),
+            re_path(r'^big/$', lambda request: HttpResponse(b'x' * 300000)),
+            re_path(r'^redir/\d/$', lambda request: redirect('/working/')),
+        ]):
+            class ForkedTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/working/', '/big/', '/redir/1/', '/redir/2/', '/big/?again']
+                instant_fork_workers = 2
+                instant_share_redirects = True
+
+            test = ForkedTest('test_no_errors')
+            test.setUp()
+
+            self.assertEqual(len(test.instant_responses()['/big/?again'].content), 300000)
+            self.assertEqual(test.instant_redirects(), {'/redir/1/': '/working/', '/redir/2/': '/working/'})
+            self.assertEqual(
+                sorted(test._get_instant_cache()['patterns']), ['/big/', '/big/?again', '/working/'])
+
+    def test_max_errors(self):  # type: () -> None
+        with mocked_patterns([
+            re_path(r'^broken/\d+/$', BrokenView.as_view()),
+        ]):
+            results = get_results_for(
+                'test_no_errors', covered_urls=['/broken/{}/'.format(n) for n in range(5)],
+                instant_max_errors=2,
+            )
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following errors were raised:\n\n"
+                "/broken/0/: this view is broken\n"
+                "  ...and the same error on 1 more URL, including /broken/1/\n\n"
+                "Gave up early; 3 covered URLs were not loaded.\n\n" +
+                INSTANT_TRACEBACKS_TUTORIAL.format(name='EverythingTest')
+            )
+
+    def test_canary_first(self):  # type: () -> None
+        calls = []
+
+        def view(request, letter):  # type: (django.http.HttpRequest, str) -> HttpResponse
+            calls.append(request.path)
+            return HttpResponse()
+
+        with mocked_patterns([
+            re_path(r'^a/(\d)/$', view),
+            re_path(r'^b/(\d)/$', view, name='b'),
+        ]):
+            get_results_for(
+                'test_no_errors', covered_urls=['/a/1/', '/a/2/', '/b/1/', '/a/3/', '/b/2/'],
+                instant_canary_first=True,
+            )
+            self.assertEqual(calls, ['/a/1/', '/b/1/', '/a/2/', '/a/3/', '/b/2/'])
+
+    def test_sampling(self):  # type: () -> None
+        calls = []
+
+        def view(request, number):  # type: (django.http.HttpRequest, str) -> HttpResponse
+            calls.append(request.path)
+            return HttpResponse()
+
+        with mocked_patterns([
+            re_path(r'^a/(\d+)/$', view),
+            re_path(r'^b/(\d+)/$', view, name='b'),
+        ]):
+            covered_urls = ['/a/{}/'.format(n) for n in range(10)] + ['/b/{}/'.format(n) for n in range(10)]
+
+            results = get_results_for('test_no_errors', covered_urls=covered_urls, instant_sample_size=2)
+            self.assertEqual(results.picky_failures, [])
+            self.assertEqual(len([c for c in calls if c.startswith('/a/')]), 2)
+            self.assertEqual(len([c for c in calls if c.startswith('/b/')]), 2)
+
+            first_calls, calls[:] = list(calls), []
+            get_results_for('test_no_errors', covered_urls=covered_urls, instant_sample_size=2)
+            self.assertEqual(calls, first_calls)
+
+            results = get_results_for(
+                'test_all_urls_accounted_for', covered_urls=covered_urls, instant_sample_size=1)
+            self.assertEqual(results.picky_failures, [])
+
+    def test_findings_written_and_report_summarised(self):  # type: () -> None
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        findings_path = os.path.join(tempdir, 'findings.jsonl')
+
+        def missing_view(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            raise Http404
+
+        with mocked_patterns([
+            re_path(r'^404/\d+/$', missing_view),
+        ]):
+            results = get_results_for(
+                'test_acceptable_status_codes', covered_urls=['/404/{}/'.format(n) for n in range(5)],
+                instant_findings_path=findings_path, instant_report_limit=2,
+            )
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following bad status codes were seen:\n\n"
+                "/404/0/: 404\n"
+                "/404/1/: 404\n"
+                "...and 3 more (see {0})".format(findings_path)
+            )
+
+        with open(findings_path) as findings_file:
+            findings = [json.loads(line) for line in findings_file]
+
+        self.assertEqual(
+            [(f['url'], f['check'], f['severity'], f['detail']) for f in findings],
+            [('/404/{}/'.format(n), 'acceptable_status_codes', 'error', '404') for n in range(5)],
+        )
+        self.assertTrue(all(isinstance(f['timing'], float) for f in findings))
+
+    def test_findings_written_per_worker(self):  # type: () -> None
+        from mock import patch
+        from ..findings import get_process_path
+
+        self.assertEqual(get_process_path('out/findings.jsonl'), 'out/findings.jsonl')
+
+        with patch.dict(os.environ, {'PYTEST_XDIST_WORKER': 'gw1'}):
+            self.assertEqual(get_process_path('out/findings.jsonl'), 'out/findings.gw1.jsonl')
+
+    def test_baseline(self):  # type: () -> None
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        baseline_path = os.path.join(tempdir, 'baseline.json')
+
+        with mocked_patterns([
+            re_path(r'^broken/\d+/$', BrokenView.as_view()),
+            re_path(r'^untested/$', WorkingView.as_view()),
+        ]):
+            results = get_results_for(
+                'test_no_errors', covered_urls=['/broken/1/'],
+                instant_baseline_path=baseline_path, instant_update_baseline=True,
+            )
+            self.assertEqual(results.picky_failures, [])
+
+            results = get_results_for(
+                'test_all_urls_accounted_for', covered_urls=['/broken/1/'],
+                instant_baseline_path=baseline_path, instant_update_baseline=True,
+            )
+            self.assertEqual(results.picky_failures, [])
+
+            results = get_results_for(
+                'test_no_errors', covered_urls=['/broken/1/', '/broken/2/'],
+                instant_baseline_path=baseline_path,
+            )
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following errors were raised:\n\n"
+                "/broken/2/: this view is broken\n\n" +
+                INSTANT_TRACEBACKS_TUTORIAL.format(name='EverythingTest')
+            )
+
+            results = get_results_for(
+                'test_all_urls_accounted_for', covered_urls=['/broken/1/'],
+                instant_baseline_path=baseline_path,
+            )
+            self.assertEqual(results.picky_failures, [])
+
+    def test_baseline_updated_by_several_processes(self):  # type: () -> None
+        from ..findings import Baseline, Finding
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        baseline_path = os.path.join(tempdir, 'baseline.json')
+
+        def finding(url, fingerprint):  # type: (str, str) -> Finding
+            return Finding(url, 'check', 'error', 'detail', None, fingerprint)
+
+        first, second = Baseline(baseline_path), Baseline(baseline_path)
+        first.replace('check', ['/a/'], [finding('/a/', 'aaa')])
+        first.save()
+        second.replace('check', ['/b/'], [finding('/b/', 'bbb')])
+        second.save()
+
+        self.assertEqual(Baseline(baseline_path).index, {'check': {'/a/': {'aaa'}, '/b/': {'bbb'}}})
+
+        first.replace('check', ['/a/'], [])
+        first.save()
+        self.assertEqual(Baseline(baseline_path).index, {'check': {'/b/': {'bbb'}}})
+
+    def test_tracebacks_kept_for_first_few_of_each_kind_of_error(self):  # type: () -> None
+        collector = ErrorCollector(tracebacks_per_group=2)
+        errors = []
+
+        for n in range(5):
+            try:
+                raise ValueError('bad value {}'.format(n))
+            except ValueError:
+                errors.append(collector.capture(sys.exc_info()))
+
+        self.assertEqual([e.traceback is not None for e in errors], [True, True, False, False, False])
+        self.assertEqual([e.message for e in errors], ['bad value {}'.format(n) for n in range(5)])
+        self.assertEqual(len(collector.groups), 1)
+        self.assertEqual(len(set(e.signature for e in errors)), 1)
+
+    def test_baseline_signature_ignores_lines_and_checkout(self):  # type: () -> None
+        collector = ErrorCollector()
+        errors = []
+
+        try:
+            raise ValueError('bad value 1')
+        except ValueError:
+            errors.append(collector.capture(sys.exc_info()))
+        try:
+            raise ValueError('bad value 2')
+        except ValueError:
+            errors.append(collector.capture(sys.exc_info()))
+
+        self.assertNotEqual(errors[0].signature, errors[1].signature)
+        self.assertEqual(errors[0].baseline_signature, errors[1].baseline_signature)
+        self.assertEqual(
+            errors[0].origin,
+            'instant_coverage/tests/test_mixin.py in test_baseline_signature_ignores_lines_and_checkout',
+        )
+
+    def test_identical_errors_clustered(self):  # type: () -> None
+        def differently_broken(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            raise ValueError('this view is broken differently')
+
+        with mocked_patterns([
+            re_path(r'^broken/\d+/$', BrokenView.as_view()),
+            re_path(r'^differently-broken/$', differently_broken),
+        ]):
+            results = get_results_for(
+                'test_no_errors',
+                covered_urls=['/broken/{}/'.format(n) for n in range(5)] + ['/differently-broken/'],
+            )
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following errors were raised:\n\n"
+                "/broken/0/: this view is broken\n"
+                "  ...and the same error on 4 more URLs, including /broken/1/, /broken/2/, /broken/3/\n"
+                "/differently-broken/: this view is broken differently\n\n" +
+                INSTANT_TRACEBACKS_TUTORIAL.format(name='EverythingTest')
+            )
+
+            results = get_results_for(
+                'test_no_errors', covered_urls=['/broken/{}/'.format(n) for n in range(5)],
+                instant_tracebacks=True,
+            )
+            assert results.picky_failures[0][1][1] is not None
+            message = results.picky_failures[0][1][1].args[0]
+            self.assertEqual(message.count('most recent call last'), 1)
+            self.assertIn('...and the same error on 4 more URLs', message)
+
+    def test_shared_redirects(self):  # type: () -> None
+        calls = []
+
+        def redir(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            calls.append(request.path)
+            return redirect('/target/')
+
+        def redir_with_slash(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            calls.append(request.path)
+            return redirect(request.path + '/')
+
+        def target(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            calls.append(request.path)
+            return HttpResponse('hihi')
+
+        def loop(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return redirect('/loop/')
+
+        with mocked_patterns([
+            re_path(r'^redir/\d+/$', redir),
+            re_path(r'^redir/\d+$', redir_with_slash),
+            re_path(r'^target/$', target),
+            re_path(r'^loop/$', loop),
+        ]):
+            class SharedRedirectsTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/redir/1/', '/redir/2', '/loop/']
+                instant_share_redirects = True
+
+            test = SharedRedirectsTest('test_acceptable_status_codes')
+            test.setUp()
+            self.assertEqual(calls, [])
+
+            responses = test.instant_responses()
+            self.assertEqual(calls, ['/redir/1/', '/target/', '/redir/2', '/redir/2/'])
+            self.assertEqual(responses['/redir/1/'].content, b'hihi')
+            self.assertEqual(responses['/redir/2'].content, b'hihi')
+            self.assertEqual(responses['/redir/2'].redirect_chain, [('/redir/2/', 302), ('/target/', 302)])
+            self.assertEqual(test.instant_redirects(), {
+                '/redir/1/': '/target/',
+                '/redir/2': '/redir/2/',
+                '/redir/2/': '/target/',
+                '/loop/': '/loop/',
+            })
+            self.assertEqual(test.instant_errors()['/loop/'].message, 'Redirect loop detected.')
+
+            del calls[:]
+
+            class DirectTargetTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/target/', '/redir/1/']
+                instant_share_redirects = True
+
+            direct_test = DirectTargetTest('test_acceptable_status_codes')
+            direct_test.setUp()
+            responses = direct_test.instant_responses()
+            self.assertEqual(calls, ['/target/', '/redir/1/'])
+            self.assertEqual(responses['/redir/1/'].content, b'hihi')
+            self.assertEqual(responses['/redir/1/'].redirect_chain, [('/target/', 302)])
+            self.assertEqual(responses['/target/'].redirect_chain, [])
+
+    def test_personas(self):  # type: () -> None
+        set_up = []  # type: List[str]
+        seen = []  # type: List[Tuple[str, str]]
+
+        class PersonaClient(django.test.Client):
+            pass
+
+        def set_up_persona(client, persona):  # type: (Client, str) -> None
+            self.assertIsInstance(client, PersonaClient)
+            set_up.append(persona)
+            if persona != 'anonymous':
+                client.defaults['HTTP_X_PERSONA'] = persona
+
+        def page(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            persona = request.META.get('HTTP_X_PERSONA', 'anonymous')
+            seen.append((request.path, persona))
+            if request.path.startswith('/staff/') and persona != 'staff':
+                return HttpResponse(status=403)
+            return HttpResponse(persona)
+
+        with mocked_patterns([
+            re_path(r'^public/$', page),
+            re_path(r'^staff/$', page),
+        ]):
+            results = get_results_for(
+                'test_acceptable_status_codes',
+                covered_urls=['/public/', '/staff/'],
+                instant_personas=['anonymous', 'staff'],
+                set_up_persona=set_up_persona,
+                client_class=PersonaClient,
+            )
+
+        self.assertEqual(set_up, ['anonymous', 'staff'])
+        self.assertEqual(seen, [
+            ('/public/', 'anonymous'), ('/staff/', 'anonymous'),
+            ('/public/', 'staff'), ('/staff/', 'staff'),
+        ])
+        assert results.picky_failures[0][1][1] is not None
+        self.assertEqual(
+            results.picky_failures[0][1][1].args[0],
+            'The following bad status codes were seen:\n\n'
+            '/staff/ (as anonymous): 403',
+        )
+
+    def test_live_server(self):  # type: () -> None
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):  # type: (*Any) -> None
+                pass
+
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        server.set_app(WSGIHandler())
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        with mocked_patterns([
+            re_path(r'^working/\d+/$', WorkingView.as_view()),
+            re_path(r'^broken/$', BrokenView.as_view()),
+            re_path(r'^redirect/$', lambda request: redirect('/working/1/')),
+        ]):
+            class LiveTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/working/1/', '/working/2/', '/broken/', '/redirect/']
+                instant_live_server_url = 'http://127.0.0.1:{0}'.format(server.server_address[1])
+
+            test = LiveTest('test_no_errors')
+            test.setUp()
+
+            responses = test.instant_responses()
+            self.assertEqual(sorted(responses), ['/redirect/', '/working/1/', '/working/2/'])
+            self.assertEqual(responses['/redirect/'].status_code, 200)
+            self.assertEqual(responses['/redirect/'].redirect_chain, [('/working/1/', 302)])
+            self.assertEqual(test.instant_redirects(), {'/redirect/': '/working/1/'})
+            self.assertEqual(list(test.instant_errors()), ['/broken/'])
+            self.assertEqual(test.instant_errors()['/broken/'].message, 'this view is broken')
+
+    def test_checks_dispatched_by_content_type(self):  # type: () -> None
+        calls = []  # type: List[Tuple[str, str]]
+
+        def json_view(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse('{}', content_type='application/json; charset=utf-8')
+
+        with mocked_patterns([
+            re_path(r'^html/$', WorkingView.as_view()),
+            re_path(r'^json/$', json_view),
+        ]):
+            class ChecksTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/html/', '/json/']
+
+                @instant_check('json', content_types=['application/json'])
+                def check_json(self, url, response):  # type: (str, HttpResponse) -> int
+                    calls.append(('json', url))
+                    return len(response.content)
+
+                @instant_check('everything')
+                def check_everything(self, url, response):  # type: (str, HttpResponse) -> None
+                    calls.append(('everything', url))
+
+                @instant_check('broken', content_types=['text/html'])
+                def check_broken(self, url, response):  # type: (str, HttpResponse) -> None
+                    calls.append(('broken', url))
+                    raise ValueError('this check is broken')
+
+            test = ChecksTest('test_no_errors')
+            test.setUp()
+
+            self.assertEqual(test.instant_check_results('json'), {'/json/': 2})
+            self.assertEqual(test.instant_check_results('everything'), {'/html/': None, '/json/': None})
+            with self.assertRaises(ValueError) as raised:
+                test.instant_check_results('broken')
+            self.assertEqual(raised.exception.args, ('this check is broken',))
+            self.assertIn('in check_broken', str(raised.exception.__cause__))
+
+            kept, _ = test._get_instant_cache()['check_errors']['broken']
+            self.assertIsNone(kept.__traceback__)
+
+            self.assertEqual(calls, [
+                ('broken', '/html/'), ('everything', '/html/'),
+                ('json', '/json/'), ('everything', '/json/'),
+            ])
+
+    def test_checks_profiled(self):  # type: () -> None
+        from ..profiling import profiler
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        profile_path = os.path.join(tempdir, 'profile.json')
+        self.addCleanup(profiler.report_paths.discard, profile_path)
+
+        with mocked_patterns([
+            re_path(r'^html/$', WorkingView.as_view()),
+            re_path(r'^other-html/$', WorkingView.as_view()),
+        ]):
+            class ProfiledChecksTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/html/', '/other-html/']
+                instant_profile_path = profile_path
+
+                @instant_check('profiled', content_types=['text/html'])
+                def check_profiled(self, url, response):  # type: (str, HttpResponse) -> None
+                    pass
+
+            test = ProfiledChecksTest('test_no_errors')
+            test.setUp()
+            test.instant_check_results('profiled')
+            test.doCleanups()
+
+            profiles = dict(((p['kind'], p['name']), p) for p in test.instant_profiles())
+            self.assertEqual(profiles['load', 'ProfiledChecksTest']['items'], 2)
+            self.assertEqual(profiles['check', 'profiled']['calls'], 2)
+            self.assertEqual(profiles['check', 'profiled']['items'], 2)
+            self.assertEqual(profiles['test', 'ProfiledChecksTest.test_no_errors']['calls'], 1)
+            self.assertIsNone(profiles['check', 'profiled']['peak_memory'])
+
+            class UnprofiledChecksTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/html/']
+
+                @instant_check('unprofiled')
+                def check_unprofiled(self, url, response):  # type: (str, HttpResponse) -> None
+                    pass
+
+            unprofiled_test = UnprofiledChecksTest('test_no_errors')
+            unprofiled_test.setUp()
+            unprofiled_test.instant_check_results('unprofiled')
+            unprofiled_test.doCleanups()
+
+            self.assertNotIn(('check', 'unprofiled'), [
+                (p['kind'], p['name']) for p in unprofiled_test.instant_profiles()])
+
+    @skipIf(django.VERSION < (3, 1), 'ResolverMatch.tried needs django 3.1')
+    def test_resolution_reused_from_crawl(self):  # type: () -> None
+        from mock import patch
+        from .. import resolve
+
+        with mocked_patterns([
+            re_path(r'^loaded/$', WorkingView.as_view()),
+            re_path(r'^not-loaded/$', WorkingView.as_view()),
+        ]):
+            class ReuseTest(InstantCoverageMixin, TestCase):
+                covered_urls = ['/loaded/']
+                uncovered_urls = ['/not-loaded/']
+
+            test = ReuseTest('test_all_urls_accounted_for')
+            test.setUp()
+            test.instant_responses()
+
+            with patch('instant_coverage.resolve', wraps=resolve) as watched_resolve:
+                test.test_all_urls_accounted_for()
+
+            self.assertEqual(
+                [call[0][0] for call in watched_resolve.call_args_list],
+                ['/not-loaded/'],
+            )
@@ -1,12 +1,31 @@
+import json
+import os
 import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from timeit import default_timer
+from typing import cast
+from unittest import skipIf
 
 import django
+from django.db import DEFAULT_DB_ALIAS, connection, connections
 from django.http import HttpResponse
 from django.test import SimpleTestCase
+from django.test.utils import override_settings
 
-from instant_coverage import optional
+import six
+from six.moves import BaseHTTPServer, socketserver
 
-from .utils import get_results_for, mocked_patterns
+from instant_coverage import InstantCoverageMixin, optional
+
+from .utils import BrokenView, WorkingView, get_results_for, mocked_patterns
+
+if sys.version_info >= (3, 6):
+    from typing import Any, List, Optional, Tuple  # noqa: F401
+    from .utils import PickyTestResult  # noqa: F401
 
 if django.VERSION > (3, 0):
     from django.urls import re_path
@@ -14,6 +33,19 @@ else:
     from django.conf.urls import url as re_path  # type: ignore
 
 
+class ImportTest(SimpleTestCase):
+    def test_heavy_dependencies_not_imported_up_front(self):  # type: () -> None
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            'import django; django.setup() if django.VERSION >= (1, 7) else None\n'
+            'import sys\n'
+            'import instant_coverage.optional\n'
+            'print(sorted(m for m in ["bs4", "html5lib", "requests", "mock", '
+            '"multiprocessing", "tracemalloc"] if m in sys.modules))',
+        ])
+        self.assertEqual(output.strip(), b'[]')
+
+
 class ValidJSONTest(SimpleTestCase):
     def test_valid_json(self):  # type: () -> None
         def valid_json(request):  # type: (django.http.HttpRequest) -> HttpResponse
@@ -25,14 +57,18 @@ class ValidJSONTest(SimpleTestCase):
         def not_json(request):  # type: (django.http.HttpRequest) -> HttpResponse
             return HttpResponse('garbage', content_type='text/html')
 
+        def utf16_json(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse(u'{}'.encode('utf-16'), content_type='application/json')
+
         with mocked_patterns([
             re_path(r'^valid/$', valid_json),
             re_path(r'^invalid/$', invalid_json),
             re_path(r'^not/$', not_json),
+            re_path(r'^utf16/$', utf16_json),
         ]):
             results = get_results_for(
                 'test_valid_json', mixin=optional.ValidJSON,
-                covered_urls=['/valid/', '/invalid/', '/not/']
+                covered_urls=['/valid/', '/invalid/', '/not/', '/utf16/']
             )
             assert results.picky_failures[0][1][1] is not None
             self.assertTrue(
@@ -45,6 +81,7 @@ class ValidJSONTest(SimpleTestCase):
                     error=results.picky_failures[0][1][1].args[0]
                 )
             )
+            self.assertIn('\n/utf16/: ', results.picky_failures[0][1][1].args[0])
 
     def test_no_json(self):  # type: () -> None
         """
@@ -69,6 +106,38 @@ class ValidJSONTest(SimpleTestCase):
                 "'application/json'."
             )
 
+    def test_json_schemas(self):  # type: () -> None
+        def matching(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse('{"name": "hi"}', content_type='application/json')
+
+        def not_matching(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse('{"name": 3}', content_type='application/json')
+
+        def unschemad(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse('[1, 2]', content_type='application/json')
+
+        with mocked_patterns([
+            re_path(r'^api/matching/$', matching),
+            re_path(r'^api/not-matching/$', not_matching),
+            re_path(r'^other/$', unschemad),
+        ]):
+            results = get_results_for(
+                'test_valid_json', mixin=optional.ValidJSON,
+                covered_urls=['/api/matching/', '/api/not-matching/', '/other/'],
+                json_schemas={r'^/api/': {
+                    'type': 'object',
+                    'properties': {'name': {'type': 'string'}},
+                    'required': ['name'],
+                }},
+            )
+            assert results.picky_failures[0][1][1] is not None
+            self.assertEqual(
+                results.picky_failures[0][1][1].args[0],
+                "The following URLs returned invalid JSON:\n\n"
+                "/api/not-matching/: does not match schema: "
+                "3 is not of type 'string' (at name)"
+            )
+
 
 class ExternalLinksTest(SimpleTestCase):
     def test_external_links(self):  # type: () -> None
@@ -125,6 +194,96 @@ class ExternalLinksTest(SimpleTestCase):
             self.assertNotIn("google", result_string)
 
 
+class RateLimitedServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    A local server that responds with 429 to anyone requesting more than once
+    every min_interval seconds, and to the first request for /flaky/.
+    """
+
+    daemon_threads = True
+    min_interval = 0.05
+
+    def __init__(self):  # type: () -> None
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), RateLimitedHandler)
+        self.lock = threading.Lock()
+        self.last_request = None  # type: Optional[float]
+        self.requests = []  # type: List[Tuple[str, int]]
+
+
+class RateLimitedHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):  # type: () -> None
+        server = cast(RateLimitedServer, self.server)
+
+        with server.lock:
+            now = default_timer()
+            too_soon = (
+                server.last_request is not None and
+                now - server.last_request < server.min_interval
+            )
+            server.last_request = now
+            flaky = self.path == '/flaky/' and not any(
+                path == self.path for path, status in server.requests)
+            status = 429 if too_soon or flaky else 200
+            server.requests.append((self.path, status))
+
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):  # type: (*Any) -> None
+        pass
+
+
+class ExternalLinksPolitenessTest(SimpleTestCase):
+    def setUp(self):  # type: () -> None
+        self.server = RateLimitedServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def get_results(self, **attributes):  # type: (**Any) -> PickyTestResult
+        root = 'http://127.0.0.1:{0}'.format(self.server.server_address[1])
+
+        def page_with_links(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse(''.join(
+                '<a href="{0}/{1}/"></a>'.format(root, path)
+                for path in ['a', 'b', 'c', 'd', 'flaky']
+            ), content_type='text/html')
+
+        with mocked_patterns([
+            re_path(r'^page/$', page_with_links),
+        ]):
+            return get_results_for(
+                'test_external_links', mixin=optional.ExternalLinks,
+                covered_urls=['/page/'], **attributes
+            )
+
+    def test_rate_limit_respected(self):  # type: () -> None
+        results = self.get_results(
+            external_link_workers=4,
+            external_link_host_rates={'127.0.0.1:{0}'.format(self.server.server_address[1]): 15},
+        )
+        self.assertEqual(results.picky_failures, [])
+        self.assertEqual(sorted(self.server.requests), [
+            ('/a/', 200), ('/b/', 200), ('/c/', 200), ('/d/', 200),
+            ('/flaky/', 200), ('/flaky/', 429),
+        ])
+
+    def test_retries_give_up(self):  # type: () -> None
+        results = self.get_results(
+            external_link_workers=1, external_link_rate=15,
+            external_link_retries=0,
+        )
+        assert results.picky_failures[0][1][1] is not None
+        result_string = results.picky_failures[0][1][1].args[0]
+        six.assertRegex(self, result_string, r'/flaky/: 429\nshown on /page/')
+        self.assertNotIn('/a/', result_string)
+
+
 class ValidHTML5Test(SimpleTestCase):
     def test_valid_json(self):  # type: () -> None
         def valid_html(request):  # type: (django.http.HttpRequest) -> HttpResponse
@@ -211,6 +370,35 @@ class SpellingTest(SimpleTestCase):
                             '"{0}" does not end with "{1}"'.format(
                                 result_string, expected_end))
 
+    def test_words_gathered_in_processes(self):  # type: () -> None
+        def page(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse(
+                '<p>page {0}</p><script>scriptword()</script>'.format(
+                    'odd' if int(request.path.strip('/')) % 2 else 'even'))
+
+        with mocked_patterns([
+            re_path(r'^\d+/$', page),
+        ]):
+            class GatheringTest(optional.Spelling, InstantCoverageMixin, SimpleTestCase):
+                covered_urls = ['/{0}/'.format(i) for i in range(5)]
+                spelling_processes = 2
+
+            test = GatheringTest('test_no_errors')
+            test.setUp()
+
+            self.assertEqual(test.get_spelling_words(), {
+                'page': ['/0/', '/1/', '/2/', '/3/', '/4/'],
+                'even': ['/0/', '/2/', '/4/'],
+                'odd': ['/1/', '/3/'],
+            })
+
+            # a handful of pages isn't worth starting processes for
+            from mock import patch
+
+            with patch.object(test, 'spelling_processes', None), patch('multiprocessing.Pool') as pool:
+                self.assertEqual(test.get_spelling_words()['odd'], ['/1/', '/3/'])
+            self.assertFalse(pool.called)
+
     def test_no_language_provided(self):  # type: () -> None
         self.assertRaisesMessage(
             Exception,
@@ -264,3 +452,268 @@ class WCAGZooTest(SimpleTestCase):
                           results.picky_failures[0][1][1].args[0])
             self.assertNotIn("/valid/", results.picky_failures[0][1][1].args[0])
             self.assertNotIn("/not/", results.picky_failures[0][1][1].args[0])
+
+
+class LoadTestTest(SimpleTestCase):
+    def test_load(self):  # type: () -> None
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        findings_path = os.path.join(tempdir, 'findings.jsonl')
+
+        with mocked_patterns([
+            re_path(r'^working/\d+/$', WorkingView.as_view()),
+            re_path(r'^broken/$', BrokenView.as_view()),
+        ]):
+            results = get_results_for(
+                'test_load', mixin=optional.LoadTest,
+                covered_urls=['/working/1/', '/working/2/', '/broken/'],
+                instant_load_requests=30, instant_load_concurrency=3,
+                load_test_max_error_rate=0.5, instant_findings_path=findings_path,
+            )
+
+        with open(findings_path) as findings_file:
+            findings = [json.loads(line) for line in findings_file]
+        self.assertEqual(
+            [(f['check'], f['severity'], f['detail'].split(', p50')[0]) for f in findings],
+            [('load', 'info', '^working/\\d+/$: 20 requests, 0 errors'),
+             ('load', 'info', '^broken/$: 10 requests, 10 errors')],
+        )
+
+        assert results.picky_failures[0][1][1] is not None
+        self.assertEqual(
+            results.picky_failures[0][1][1].args[0],
+            'The following URL patterns failed too often under load:\n\n'
+            '^broken/$: 10 of 10 requests',
+        )
+
+    def test_histogram(self):  # type: () -> None
+        from instant_coverage.load import LatencyHistogram
+
+        histogram = LatencyHistogram()
+        for microseconds in range(1, 10001):
+            histogram.record(microseconds / 1e6)
+
+        self.assertEqual(histogram.count, 10000)
+        self.assertEqual((histogram.min, histogram.max), (1, 10000))
+        for percent in (50, 90, 99):
+            value = histogram.percentile(percent)
+            assert value is not None
+            self.assertAlmostEqual(value, percent * 100, delta=percent)
+
+
+class StaticAssetsTest(SimpleTestCase):
+    def test_static_assets(self):  # type: () -> None
+        static_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_dir)
+        os.mkdir(os.path.join(static_dir, 'css'))
+        with open(os.path.join(static_dir, 'css', 'site.css'), 'w') as css:
+            css.write('body {}')
+        with open(os.path.join(static_dir, 'big.js'), 'w') as js:
+            js.write('x' * 2000)
+
+        def page(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse(
+                '<link rel="stylesheet" href="/static/css/site.css?v=2">'
+                '<script src="/static/big.js"></script>'
+                '<img src="/static/missing.png">'
+                '<img src="https://example.com/static/elsewhere.png">',
+                content_type='text/html',
+            )
+
+        with mocked_patterns([
+            re_path(r'^page/\d+/$', page),
+        ]), override_settings(STATIC_URL='/static/', STATICFILES_DIRS=[static_dir]):
+            results = get_results_for(
+                'test_static_assets', mixin=optional.StaticAssets,
+                covered_urls=['/page/1/', '/page/2/'],
+                static_asset_max_sizes={'.js': 1000},
+            )
+
+        assert results.picky_failures[0][1][1] is not None
+        self.assertEqual(
+            results.picky_failures[0][1][1].args[0],
+            'The following static assets are missing or too big:\n\n'
+            'big.js: 2000 bytes, which is more than 1000\n'
+            'referred to on /page/1/, /page/2/\n\n'
+            'missing.png: not found\n'
+            'referred to on /page/1/, /page/2/',
+        )
+
+    def test_no_static_url(self):  # type: () -> None
+        with mocked_patterns([
+            re_path(r'^$', WorkingView.as_view()),
+        ]), override_settings(STATIC_URL=None):
+            self.assertRaisesMessage(
+                Exception,
+                'Set STATIC_URL in your settings, so that static assets can be '
+                'told apart from everything else.',
+                lambda: get_results_for(
+                    'test_static_assets', mixin=optional.StaticAssets, covered_urls=['/']),
+            )
+
+
+class InternalLinksTest(SimpleTestCase):
+    def test_internal_links(self):  # type: () -> None
+        loaded = []  # type: List[str]
+
+        def index(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            loaded.append(request.path)
+            return HttpResponse(
+                '<a href="/things/1/">1</a> <a href="things/2/">2</a>'
+                '<a href="/things/3/">3</a> <a href="/things/1/#top">1 again</a>'
+                '<a href="/missing/">missing</a> <a href="/broken/">broken</a>'
+                '<a href="/">home</a> <a href="#top">top</a>'
+                '<a href="mailto:someone@example.com">mail</a>'
+                '<a href="https://example.com/things/4/">elsewhere</a>'
+                '<link rel="stylesheet" href="/things/5/">',
+                content_type='text/html',
+            )
+
+        def thing(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            loaded.append(request.path)
+            return HttpResponse('<a href="/deeper/">deeper</a>', content_type='text/html')
+
+        with mocked_patterns([
+            re_path(r'^$', index),
+            re_path(r'^things/\d+/$', thing),
+            re_path(r'^broken/$', BrokenView.as_view()),
+            re_path(r'^deeper/$', thing),
+        ]):
+            results = get_results_for(
+                'test_internal_links', mixin=optional.InternalLinks,
+                covered_urls=['/'], instant_crawl_per_pattern=2,
+            )
+
+        self.assertEqual(loaded, ['/', '/things/1/', '/things/2/'])
+        assert results.picky_failures[0][1][1] is not None
+        self.assertEqual(
+            results.picky_failures[0][1][1].args[0],
+            'The following internal links are broken:\n\n'
+            '/missing/: 404\nlinked to from /\n\n'
+            '/broken/: this view is broken\nlinked to from /',
+        )
+
+
+class SnapshotsTest(SimpleTestCase):
+    def test_snapshots(self):  # type: () -> None
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        snapshot_path = os.path.join(snapshot_dir, 'snapshots.zip')
+        heading = ['Hello']
+        renders = []  # type: List[str]
+
+        def page(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            renders.append(request.path)
+            return HttpResponse(
+                '<h1>{0}</h1>\n'
+                '<input type="hidden" name="csrfmiddlewaretoken" value="{1}">\n'
+                '<p>rendered at 2024-01-0{1}T12:00:00Z</p>'.format(heading[0], len(renders)),
+                content_type='text/html',
+            )
+
+        image = [b'\xff\xfe']
+
+        def picture(request):  # type: (django.http.HttpRequest) -> HttpResponse
+            return HttpResponse(image[0], content_type='image/png')
+
+        with mocked_patterns([
+            re_path(r'^page/\d+/$', page),
+            re_path(r'^image/$', picture),
+        ]):
+            def run(**attributes):  # type: (**Any) -> Optional[str]
+                attributes.setdefault('covered_urls', ['/page/1/', '/page/2/', '/image/'])
+                results = get_results_for(
+                    'test_snapshots', mixin=optional.Snapshots,
+                    snapshot_path=snapshot_path, **attributes)
+                if not results.picky_failures:
+                    return None
+                return cast(BaseException, results.picky_failures[0][1][1]).args[0]
+
+            self.assertIn('/page/1/: no snapshot', run() or '')
+            self.assertIsNone(run(update_snapshots=True))
+            self.assertIsNone(run())
+
+            # these decode to the same text, but aren't the same image
+            image[0] = b'\xfe\xff'
+            image_failure = run(covered_urls=['/image/'])
+
+            heading[0] = 'Goodbye'
+            failure = run(covered_urls=['/page/2/'])
+
+        assert image_failure is not None
+        self.assertIn('-[2 bytes of image/png, sha1 ', image_failure)
+
+        assert failure is not None
+        self.assertIn(
+            '--- snapshot of /page/2/\n'
+            '+++ /page/2/\n'
+            '@@ -1,4 +1,4 @@\n'
+            ' 200\n'
+            '-<h1>Hello</h1>\n'
+            '+<h1>Goodbye</h1>\n'
+            ' <input type="hidden" name="csrfmiddlewaretoken" value="[csrf token]">\n'
+            ' <p>rendered at [timestamp]</p>\n\n'
+            'If these changes are intended, set EverythingTest.update_snapshots',
+            failure,
+        )
+
+
+@skipIf(django.VERSION < (3, 2), 'connections.create_connection needs django 3.2')
+class QueryCountsTest(SimpleTestCase):
+    databases = '__all__'
+
+    def setUp(self):  # type: () -> None
+        # other tests run TestCases by hand, which can leave the default
+        # connection closed inside a transaction, so use one of our own
+        original = connections[DEFAULT_DB_ALIAS]
+        connections[DEFAULT_DB_ALIAS] = connections.create_connection(DEFAULT_DB_ALIAS)
+
+        def restore():  # type: () -> None
+            connections[DEFAULT_DB_ALIAS].close()
+            connections[DEFAULT_DB_ALIAS] = original
+
+        self.addCleanup(restore)
+
+    def test_queries(self):  # type: () -> None
+        def listing(request, page):  # type: (django.http.HttpRequest, str) -> HttpResponse
+            with connection.cursor() as cursor:
+                for item in range(int(page) * 5):
+                    cursor.execute('SELECT %s, name FROM sqlite_master WHERE name = %s', [item, 'x'])
+            return HttpResponse('page {0}'.format(page))
+
+        with mocked_patterns([
+            re_path(r'^list/(?P<page>\d+)/$', listing),
+        ]):
+            class QueriesTest(optional.QueryCounts, InstantCoverageMixin, SimpleTestCase):
+                covered_urls = ['/list/1/', '/list/3/', '/list/4/']
+                databases = {DEFAULT_DB_ALIAS}
+                query_budget = 18
+
+            test = QueriesTest('test_queries')
+            test.setUp()
+
+            with self.assertRaises(AssertionError) as raised:
+                test.test_queries()
+
+        self.assertEqual(
+            raised.exception.args[0],
+            'The following URL patterns make too many database queries:\n\n'
+            '^list/(?P<page>\\d+)/$: 2 URLs, worst of which is /list/4/ with 20 queries:\n'
+            '20 queries, more than the budget of 18\n'
+            '20 times: SELECT ?, name FROM sqlite_master WHERE name = ?',
+        )
+
+    def test_nothing_counted(self):  # type: () -> None
+        with mocked_patterns([
+            re_path(r'^working/$', WorkingView.as_view()),
+        ]):
+            class NoDatabasesTest(optional.QueryCounts, InstantCoverageMixin, SimpleTestCase):
+                covered_urls = ['/working/']
+
+            test = NoDatabasesTest('test_queries')
+            test.setUp()
+
+            with self.assertRaises(AssertionError) as raised:
+                test.test_queries()
+
+        self.assertTrue(raised.exception.args[0].startswith('No queries were counted.'))
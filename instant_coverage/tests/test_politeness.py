@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase
+
+import mock
+
+from ..politeness import PoliteScheduler, TokenBucket, retry_after
+
+
+class TokenBucketTest(SimpleTestCase):
+    def test_waits_are_spaced_out(self):  # type: () -> None
+        now = [100.0]
+        bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0])
+
+        self.assertEqual([bucket.reserve() for i in range(4)], [0, 0, 0.5, 1.0])
+
+        now[0] += 10
+        self.assertEqual(bucket.reserve(), 0)
+
+
+class PoliteSchedulerTest(SimpleTestCase):
+    def test_backs_off(self):  # type: () -> None
+        waits = []  # type: list
+        statuses = iter([503, 429, 429, 429, 200])
+
+        def fetch(url):  # type: (str) -> mock.Mock
+            status = next(statuses)
+            return mock.Mock(
+                status_code=status,
+                headers={'Retry-After': '120'} if status == 429 else {},
+            )
+
+        scheduler = PoliteScheduler(backoff=1, max_wait=60, retries=3, sleep=waits.append)
+        self.assertEqual(scheduler.call('https://example.com/', fetch).status_code, 429)
+        self.assertEqual(waits, [1, 60, 60])
+
+    def test_retry_after_dates(self):  # type: () -> None
+        self.assertEqual(retry_after(
+            mock.Mock(headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:30 GMT'}),
+            now=1445412480,
+        ), 30)
+        self.assertIsNone(retry_after(mock.Mock(headers={'Retry-After': 'soon'})))
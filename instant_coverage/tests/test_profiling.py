@@ -0,0 +1,82 @@
+import sys
+import threading
+from unittest import skipIf
+
+from django.test import SimpleTestCase
+
+from ..profiling import Profiler, TemplateProfiling
+
+
+class ProfilerTest(SimpleTestCase):
+    @skipIf(sys.version_info < (3, 9), 'tracemalloc.reset_peak needs python 3.9')
+    def test_nested_memory(self):  # type: () -> None
+        profiler = Profiler()
+
+        outer = profiler.start('test', 'outer', memory=True)
+        big = b' ' * 2000000
+        inner = profiler.start('check', 'inner', items=3, memory=True)
+        small = b' ' * 100000
+        profiler.stop(inner)
+        del big, small
+        profiler.stop(outer)
+
+        profiles = dict((p['name'], p) for p in profiler.as_dicts())
+        self.assertGreaterEqual(profiles['outer']['peak_memory'], 2000000)
+        self.assertLess(profiles['inner']['peak_memory'], 1000000)
+        self.assertGreaterEqual(profiles['inner']['peak_memory'], 100000)
+        self.assertEqual(profiles['inner']['items'], 3)
+        self.assertIn('inner', profiler.format())
+
+    def test_threads_have_stacks_of_their_own(self):  # type: () -> None
+        profiler = Profiler()
+        outer = profiler.start('test', 'outer')
+        started, stop = threading.Event(), threading.Event()
+
+        def elsewhere():  # type: () -> None
+            frame = profiler.start('template', 'elsewhere')
+            started.set()
+            stop.wait()
+            profiler.stop(frame)
+
+        thread = threading.Thread(target=elsewhere)
+        thread.start()
+        started.wait()
+        self.assertEqual([f.profile.name for f in profiler.stack], ['outer'])
+        stop.set()
+        thread.join()
+
+        profiler.stop(outer)
+        self.assertEqual(profiler.stack, [])
+        self.assertEqual(
+            sorted((p['name'], p['calls']) for p in profiler.as_dicts()),
+            [('elsewhere', 1), ('outer', 1)],
+        )
+
+
+class TemplateProfilingTest(SimpleTestCase):
+    def test_templates_and_includes(self):  # type: () -> None
+        from django.template import Context, Engine
+
+        engine = Engine(loaders=[('django.template.loaders.locmem.Loader', {
+            'base.html': '<main>{% block content %}{% endblock %}</main>',
+            'page.html': (
+                '{% extends "base.html" %}{% block content %}'
+                '{% for item in items %}{% include "item.html" %}{% endfor %}'
+                '{% endblock %}'
+            ),
+            'item.html': '<p>{{ item }}</p>',
+        })])
+
+        profiler = Profiler()
+        profiling = TemplateProfiling(profiler)
+        profiling.enable()
+        try:
+            rendered = engine.get_template('page.html').render(Context({'items': [1, 2, 3]}))
+        finally:
+            profiling.disable()
+
+        self.assertEqual(rendered, '<main><p>1</p><p>2</p><p>3</p></main>')
+        self.assertEqual(
+            [(p['kind'], p['name'], p['calls']) for p in profiler.as_dicts()],
+            [('template', 'page.html', 1), ('include', 'item.html', 3)],
+        )
@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase
+
+from ..text import extract_words, index_words
+
+
+class ExtractWordsTest(SimpleTestCase):
+    def test_prose_only(self):  # type: () -> None
+        self.assertEqual(extract_words(
+            '<title>Fish &amp; chips</title>'
+            '<style>.colour { color: red }</style>'
+            '<script>var qwxz = "<p>";</script>'
+            u'<p>I don\u2019t like col<b>our</b>ful<br>words</p><p>caf&eacute;</p>'
+            '<svg><text>vectorish</text></svg><code>snake_case</code>'
+        ), set([
+            'Fish', 'chips', 'I', "don't", 'like', 'colourful', 'words', u'caf\xe9',
+        ]))
+
+    def test_index(self):  # type: () -> None
+        self.assertEqual(
+            index_words([(0, '<p>one two</p>'), (3, '<p>two</p>')]),
+            {'one': [0], 'two': [0, 3]},
+        )
@@ -0,0 +1,99 @@
+"""
+Pulling the prose out of HTML, and the words out of the prose.
+"""
+
+import re
+import sys
+
+from six.moves.html_parser import HTMLParser
+
+if sys.version_info >= (3, 6):
+    from typing import Dict, List, Optional, Sequence, Set, Tuple  # noqa: F401
+
+
+#: elements whose content is code, markup or styling rather than prose
+NON_PROSE_TAGS = frozenset([
+    'code', 'math', 'script', 'style', 'svg', 'template',
+])
+
+#: elements that don't separate the words on either side of them
+INLINE_TAGS = frozenset([
+    'a', 'abbr', 'b', 'bdi', 'bdo', 'cite', 'data', 'dfn', 'em', 'i', 'mark',
+    'q', 's', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'u',
+])
+
+#: runs of letters, along with any apostrophes inside them, so that "don't"
+#: and "l'homme" are checked as the single words dictionaries know them as
+WORD_PATTERN = re.compile(u"[^\\W\\d_]+(?:['\u2019][^\\W\\d_]+)*", re.UNICODE)
+
+
+class TextExtractor(HTMLParser):
+    """
+    Collect the text of a document, leaving out anything in NON_PROSE_TAGS.
+    """
+
+    def __init__(self):  # type: () -> None
+        HTMLParser.__init__(self)
+        self.chunks = []  # type: List[str]
+        self._skipping = []  # type: List[str]
+
+    def _separate(self, tag):  # type: (str) -> None
+        if tag not in INLINE_TAGS:
+            self.chunks.append(u' ')
+
+    def handle_starttag(self, tag, attrs):  # type: (str, List[Tuple[str, Optional[str]]]) -> None
+        self._separate(tag)
+        if tag in NON_PROSE_TAGS:
+            self._skipping.append(tag)
+
+    def handle_startendtag(self, tag, attrs):  # type: (str, List[Tuple[str, Optional[str]]]) -> None
+        self._separate(tag)
+
+    def handle_endtag(self, tag):  # type: (str) -> None
+        self._separate(tag)
+        if tag in self._skipping:
+            while self._skipping.pop() != tag:
+                pass
+
+    def handle_data(self, data):  # type: (str) -> None
+        if not self._skipping:
+            self.chunks.append(data)
+
+
+def extract_text(html):  # type: (str) -> str
+    """
+    Return the prose in html, with entities decoded.
+    """
+
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return u''.join(extractor.chunks)
+
+
+def extract_words(html):  # type: (str) -> Set[str]
+    """
+    Return every word in the prose in html, with curly apostrophes
+    straightened out.
+    """
+
+    return set(
+        word.replace(u'\u2019', u"'")
+        for word in WORD_PATTERN.findall(extract_text(html))
+    )
+
+
+def index_words(pages):  # type: (Sequence[Tuple[int, str]]) -> Dict[str, List[int]]
+    """
+    Return the numbers of the pages each word appears in, for pages given as
+    (number, html). Numbers are much smaller than URLs to send back from
+    another process.
+    """
+
+    index = {}  # type: Dict[str, List[int]]
+
+    for number, html in pages:
+        for word in extract_words(html):
+            index.setdefault(word, []).append(number)
+
+    return index
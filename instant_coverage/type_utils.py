@@ -1,8 +1,11 @@
 import sys
 import types
-from typing import Dict, TYPE_CHECKING, Tuple, Type, Union
+from collections import OrderedDict  # noqa: F401
+from typing import Any, Dict, List, Optional, TYPE_CHECKING, Tuple, Type, Union
 from unittest import TestCase
 
+from .errors import CapturedError, ErrorCollector
+
 
 ERROR_TYPE = Union[Tuple[None, None, None], Tuple[Type[BaseException], BaseException, types.TracebackType]]
 
@@ -20,7 +23,16 @@ else:
 
 class InstantCacheDict(TypedDict):
     responses: Dict[str, TestHttpResponse]
-    errors: Dict[str, ERROR_TYPE]
+    errors: Dict[str, CapturedError]
+    error_collector: ErrorCollector
+    redirects: Dict[str, str]
+    redirect_targets: Dict[str, TestHttpResponse]
+    skipped: List[str]
+    timings: Dict[str, float]
+    checks: Optional[Dict[str, Dict[str, Any]]]
+    check_errors: Dict[str, Tuple[BaseException, str]]
+    discovered: 'OrderedDict[str, List[str]]'
+    patterns: Dict[str, Any]
 
 
 if TYPE_CHECKING:
@@ -35,6 +35,7 @@ setup(
             'typing-extensions',
         ],
         'testing': [
+            'jsonschema',
             'pyenchant',
             'pytest',
             'wcag_zoo>=0.2.0',